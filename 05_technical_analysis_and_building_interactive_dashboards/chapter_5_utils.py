@@ -0,0 +1,636 @@
+import functools
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# directory of the on-disk store of the prices, kept out of the source tree
+PRICE_STORE_DIR = os.environ.get(
+    "PRICE_STORE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "price_store")
+)
+# directory of the exported files
+EXPORT_DIR = os.environ.get("EXPORT_DIR",
+                            os.path.join(PRICE_STORE_DIR, "exports"))
+
+# caches created by `ttl_lru_cache`, keyed by the decorated function. As they
+# live in this module, they survive the reruns of the Streamlit script (which
+# redefine the decorated functions) and are shared by all the sessions.
+_CACHES = {}
+
+# locks of the files of the price store, see `_get_store_lock`
+_STORE_LOCKS = {}
+_STORE_LOCKS_LOCK = threading.Lock()
+
+
+class TTLCache:
+    """
+    Thread-safe cache with a bounded size (evicting the least recently used
+    entries) and an optional time-to-live of the entries. The optional
+    `on_evict` callback is called with the value of each expired, evicted or
+    cleared entry, for example, to remove the file it refers to.
+    """
+
+    def __init__(self, max_size=128, ttl=None, on_evict=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, values):
+        if self.on_evict is not None:
+            for value in values:
+                self.on_evict(value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns a tuple (found, value) for the key, dropping the entry if it
+        has expired.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            value, created = self._entries[key]
+            expired = (self.ttl is not None
+                       and time.monotonic() - created > self.ttl)
+            if not expired:
+                self._entries.move_to_end(key)
+                return True, value
+            del self._entries[key]
+        self._evict([value])
+        return False, None
+
+    def set(self, key, value):
+        """
+        Stores the value, evicting the least recently used entries if the
+        cache is full.
+        """
+        evicted = []
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted.append(self._entries.popitem(last=False)[1][0])
+        self._evict(evicted)
+
+    def clear(self):
+        with self._lock:
+            evicted = [value for value, _ in self._entries.values()]
+            self._entries.clear()
+        self._evict(evicted)
+
+
+def ttl_lru_cache(max_size=128, ttl=None, on_evict=None, is_valid=None):
+    """
+    Decorator caching the results of a function in a `TTLCache`, keyed by
+    its arguments. The arguments have to be hashable (for example, a ticker,
+    dates and tuples of the indicator parameters), so no data frames are
+    hashed on each call. The cache is available as the `cache` attribute of
+    the decorated function.
+
+    Parameters
+    ------------
+    max_size : int
+        The maximum number of entries
+    ttl : float
+        The time-to-live of the entries in seconds, None for no expiry
+    on_evict : callable
+        Function called with the values of the expired or evicted entries
+    is_valid : callable
+        Function checking if a cached value can still be used (for example,
+        if the file it refers to exists), otherwise it is recomputed
+    """
+    def decorator(func):
+        cache_key = f"{func.__module__}.{func.__qualname__}"
+        cache = _CACHES.setdefault(cache_key,
+                                   TTLCache(max_size, ttl, on_evict))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            found, value = cache.get(key)
+            if found and is_valid is not None and not is_valid(value):
+                found = False
+            if not found:
+                value = func(*args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def _get_store_lock(data_path):
+    """
+    Helper returning the lock of a file of the price store, so concurrent
+    sessions and prefetching threads do not update the same ticker at once.
+    """
+    with _STORE_LOCKS_LOCK:
+        return _STORE_LOCKS.setdefault(data_path, threading.Lock())
+
+
+def _replace_file(path, write):
+    """
+    Helper writing a file under a temporary name with `write(tmp_path)` and
+    then renaming it, so a concurrent reader never sees a partial file.
+    """
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _extend_covered_range(covered_range, range_start, range_end):
+    """
+    Helper extending the covered range (None if nothing is stored yet) by a
+    downloaded range, which is adjacent to it. The requested range is marked
+    as covered (so the non-trading days at its ends are not downloaded
+    again), but only up to today, as the last bar can still change.
+    """
+    range_end = min(range_end, pd.Timestamp.today().normalize())
+    if covered_range is None:
+        return range_start, range_end
+    covered_start, covered_end = covered_range
+    return min(covered_start, range_start), max(covered_end, range_end)
+
+
+def load_prices(ticker, start, end, store_dir=None):
+    """
+    Loads the prices of a ticker from Yahoo Finance, using an on-disk
+    columnar (Parquet) store with one file per ticker. Only the date ranges
+    which are not covered by the store yet are downloaded. The covered range
+    is only extended by the non-empty downloads (yfinance returns an empty
+    frame when the download fails) and up to today, so failed downloads and
+    the future dates are retried on the next call.
+
+    Parameters
+    ------------
+    ticker : str
+        The ticker
+    start : str/datetime.date
+        The start date (inclusive)
+    end : str/datetime.date
+        The end date (exclusive), as in `yf.download`
+    store_dir : str
+        The directory of the store, defaults to `PRICE_STORE_DIR`
+
+    Returns
+    -----------
+    df : pd.DataFrame
+        The prices
+    """
+    # imported here, so the offline runs (see `FixtureDataProvider`) do not
+    # require yfinance
+    import yfinance as yf
+
+    store_dir = store_dir or PRICE_STORE_DIR
+    data_path = os.path.join(store_dir, f"{ticker}.parquet")
+    range_path = os.path.join(store_dir, f"{ticker}.json")
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+    with _get_store_lock(data_path):
+        if os.path.exists(data_path) and os.path.exists(range_path):
+            df = pd.read_parquet(data_path)
+            with open(range_path) as f:
+                covered = json.load(f)
+            covered_range = (pd.Timestamp(covered["start"]),
+                             pd.Timestamp(covered["end"]))
+            missing_ranges = [
+                (range_start, range_end) for range_start, range_end
+                in [(start, covered_range[0]), (covered_range[1], end)]
+                if range_start < range_end
+            ]
+        else:
+            df = None
+            covered_range = None
+            missing_ranges = [(start, end)]
+
+        new_dfs = []
+        for range_start, range_end in missing_ranges:
+            new_df = yf.download(ticker, range_start, range_end,
+                                 progress=False)
+            if isinstance(new_df.columns, pd.MultiIndex):
+                new_df.columns = new_df.columns.get_level_values(0)
+            # failed downloads (empty frames) are not marked as covered
+            if new_df.empty:
+                if df is None:
+                    return new_df
+                continue
+            new_dfs.append(new_df)
+            covered_range = _extend_covered_range(covered_range, range_start,
+                                                  range_end)
+
+        if new_dfs:
+            df = pd.concat(new_dfs if df is None else [df] + new_dfs)
+            df = df[~df.index.duplicated(keep="last")].sort_index()
+
+            # the data is written before the range, so the range never
+            # claims data which is not in the store
+            os.makedirs(store_dir, exist_ok=True)
+            _replace_file(data_path, df.to_parquet)
+
+            def write_range(path):
+                with open(path, "w") as f:
+                    json.dump({"start": str(covered_range[0]),
+                               "end": str(covered_range[1])}, f)
+
+            _replace_file(range_path, write_range)
+
+    return df.loc[(df.index >= start) & (df.index < end)]
+
+
+# supported formats of the exported data: the file extension and MIME type
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_csv_chunks(df, chunk_size=10_000):
+    """
+    Yields the data frame encoded as UTF-8 CSV in chunks of `chunk_size`
+    rows (the first one with the header), so the whole file is never held
+    in memory as a single string.
+    """
+    for ind in range(0, max(len(df), 1), chunk_size):
+        yield df.iloc[ind:ind + chunk_size].to_csv(
+            header=ind == 0
+        ).encode("utf-8")
+
+
+def export_prices(df, path, fmt="csv", chunk_size=10_000):
+    """
+    Writes the prices to a file, streaming the CSV files in chunks. The file
+    is written under a temporary name and then renamed, so a concurrent
+    reader never sees a partial file.
+
+    Parameters
+    ------------
+    df : pd.DataFrame
+        The prices
+    path : str
+        The path of the file
+    fmt : str
+        The format, one of `EXPORT_FORMATS`
+    chunk_size : int
+        The number of rows written at once (also the size of the row groups
+        of the Parquet files)
+
+    Returns
+    -----------
+    path : str
+        The path of the file
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, row_group_size=chunk_size)
+    else:
+        opener = gzip.open if fmt == "csv.gz" else open
+        with opener(tmp_path, "wb") as f:
+            for chunk in iter_csv_chunks(df, chunk_size):
+                f.write(chunk)
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def remove_export(path):
+    """
+    Removes an exported file, if it still exists.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_exports(max_age, export_dir=None):
+    """
+    Removes the exported files (including the temporary ones of interrupted
+    exports) older than `max_age` seconds, for example, the ones left by the
+    previous runs of the app.
+
+    Parameters
+    ------------
+    max_age : float
+        The maximum age of the files in seconds
+    export_dir : str
+        The directory of the exported files, defaults to `EXPORT_DIR`
+    """
+    export_dir = export_dir or EXPORT_DIR
+    if not os.path.isdir(export_dir):
+        return
+    now = time.time()
+    for entry in os.scandir(export_dir):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                remove_export(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def sma(close, periods=20):
+    """
+    Simple Moving Average of the close prices.
+    """
+    return close.rolling(window=periods).mean()
+
+
+def bollinger_bands(close, periods=20, boll_std=2):
+    """
+    Bollinger Bands of the close prices, using the sample standard deviation
+    (as in cufflinks).
+
+    Returns
+    -----------
+    bands : pd.DataFrame
+        The middle, upper and lower bands
+    """
+    rolling = close.rolling(window=periods)
+    middle = rolling.mean()
+    std = rolling.std()
+    return pd.DataFrame({"middle": middle,
+                         "upper": middle + boll_std * std,
+                         "lower": middle - boll_std * std})
+
+
+def _wilder_smoothing(x, periods):
+    """
+    Helper calculating Wilder's smoothed moving average, seeded with the
+    simple average of the first `periods` valid values.
+    """
+    valid = x.dropna()
+    seeded = valid.rolling(window=periods).mean()
+    seeded.iloc[periods:] = valid.iloc[periods:]
+    smoothed = seeded.iloc[periods - 1:].ewm(alpha=1 / periods,
+                                             adjust=False).mean()
+    return smoothed.reindex(x.index)
+
+
+def rsi(close, periods=14):
+    """
+    Relative Strength Index of the close prices, using Wilder's smoothing of
+    the gains and losses.
+    """
+    diff = close.diff()
+    avg_gain = _wilder_smoothing(diff.clip(lower=0), periods)
+    avg_loss = _wilder_smoothing((-diff).clip(lower=0), periods)
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def lttb_indices(y, n_out):
+    """
+    Selects the indices of the points preserving the visual shape of a series
+    using the Largest-Triangle-Three-Buckets algorithm. The first and last
+    points are always kept, while from each of the `n_out - 2` buckets in
+    between the point forming the largest triangle with the previously
+    selected point and the average of the next bucket is selected.
+
+    Parameters
+    ------------
+    y : np.ndarray
+        The values of the series (without NaNs)
+    n_out : int
+        The number of points to select
+
+    Returns
+    -----------
+    indices : np.ndarray
+        The sorted indices of the selected points
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bucket_size = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * bucket_size).astype(int) + 1
+    edges[-1] = n - 1
+
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev])
+                       - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + np.argmax(areas)
+        indices[i + 1] = prev
+
+    return indices
+
+
+def downsample_series(series, n_out):
+    """
+    Downsamples a series (dropping its NaNs) to at most `n_out` points using
+    `lttb_indices`.
+    """
+    series = series.dropna()
+    return series.iloc[lttb_indices(series.to_numpy(), n_out)]
+
+
+def downsample_ohlcv(df, n_out):
+    """
+    Downsamples the OHLCV data to at most `n_out` bars by aggregating
+    consecutive bars (the first open, the highest high, the lowest low, the
+    last close and the total volume), so the extremes are preserved.
+
+    Parameters
+    ------------
+    df : pd.DataFrame
+        The OHLCV data
+    n_out : int
+        The maximum number of bars
+
+    Returns
+    -----------
+    df : pd.DataFrame
+        The downsampled data, indexed by the first date of each bucket
+    """
+    if len(df) <= n_out:
+        return df
+
+    buckets = np.arange(len(df)) * n_out // len(df)
+    agg_funcs = {"Open": "first", "High": "max", "Low": "min",
+                 "Close": "last", "Adj Close": "last", "Volume": "sum"}
+    df_down = df.groupby(buckets).agg({col: func for col, func
+                                       in agg_funcs.items()
+                                       if col in df.columns})
+    df_down.index = df.index[np.unique(buckets, return_index=True)[1]]
+    return df_down
+
+
+class YahooDataProvider:
+    """
+    Provider of the S&P 500 constituents (from Wikipedia) and of the prices
+    (from Yahoo Finance, using the on-disk store of `load_prices`).
+    """
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir
+
+    def get_sp500_components(self):
+        df = pd.read_html(
+            "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+        )[0]
+        return df[["Symbol", "Security"]]
+
+    def get_prices(self, ticker, start, end):
+        return load_prices(ticker, start, end, store_dir=self.store_dir)
+
+
+class FixtureDataProvider:
+    """
+    Provider reading the data from a local directory, for offline runs. The
+    directory contains `sp500_components.csv` (with the "Symbol" and
+    "Security" columns) and the prices of the tickers in `<ticker>.parquet`
+    or `<ticker>.csv` files.
+    """
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+
+    def get_sp500_components(self):
+        return pd.read_csv(os.path.join(self.fixture_dir,
+                                        "sp500_components.csv"))
+
+    def get_prices(self, ticker, start, end):
+        path = os.path.join(self.fixture_dir, ticker)
+        if os.path.exists(f"{path}.parquet"):
+            df = pd.read_parquet(f"{path}.parquet")
+        else:
+            df = pd.read_csv(f"{path}.csv", index_col=0, parse_dates=True)
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return df.loc[(df.index >= start) & (df.index < end)]
+
+
+def get_data_provider():
+    """
+    Returns the fixture provider if the `DASHBOARD_FIXTURE_DIR` environment
+    variable is set, and the Yahoo Finance provider otherwise.
+    """
+    fixture_dir = os.environ.get("DASHBOARD_FIXTURE_DIR")
+    if fixture_dir:
+        return FixtureDataProvider(fixture_dir)
+    return YahooDataProvider()
+
+
+class DataPrefetcher:
+    """
+    Loads the data in the background on a bounded pool of threads.
+
+    The tasks are deduplicated: a task submitted again while running is not
+    started twice, and `result` waits for the running task instead of
+    loading the data once more. The prefetcher also counts the views of the
+    tickers, so the most viewed ones can be warmed in advance. Used together
+    with functions decorated with `ttl_lru_cache`, the background tasks fill
+    their caches.
+
+    Parameters
+    ------------
+    max_workers : int
+        The maximum number of threads
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+        self._views = Counter()
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        """
+        Starts `func(*args)` in the background, unless it is already running.
+        Returns the future of the task.
+        """
+        key = (func.__qualname__, args)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or future.done():
+                future = self._executor.submit(func, *args)
+                self._futures[key] = future
+                future.add_done_callback(
+                    lambda _, key=key: self._discard(key)
+                )
+            return future
+
+    def _discard(self, key):
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and future.done():
+                del self._futures[key]
+
+    def result(self, func, *args):
+        """
+        Returns `func(*args)`, waiting for the background task if it is
+        running and calling the function directly otherwise (so a cached
+        function returns immediately).
+        """
+        with self._lock:
+            future = self._futures.get((func.__qualname__, args))
+        if future is not None:
+            return future.result()
+        return func(*args)
+
+    def record_view(self, ticker):
+        with self._lock:
+            self._views[ticker] += 1
+
+    def most_viewed(self, n=5):
+        with self._lock:
+            return [ticker for ticker, _ in self._views.most_common(n)]
+
+    def prefetch_most_viewed(self, func, start, end, n=5):
+        """
+        Loads the data of the `n` most viewed tickers in the background.
+
+        Parameters
+        ------------
+        func : callable
+            The function loading the data, called as `func(ticker, start, end)`
+        start : str/datetime.date
+            The start date
+        end : str/datetime.date
+            The end date
+        n : int
+            The number of tickers
+        """
+        for ticker in self.most_viewed(n):
+            self.submit(func, ticker, start, end)
+
+
+# prefetcher shared by the reruns and sessions of the app
+_PREFETCHER = None
+_PREFETCHER_LOCK = threading.Lock()
+
+
+def get_prefetcher(max_workers=4):
+    """
+    Returns the prefetcher shared by the whole process, creating it on the
+    first call.
+    """
+    global _PREFETCHER
+    with _PREFETCHER_LOCK:
+        if _PREFETCHER is None:
+            _PREFETCHER = DataPrefetcher(max_workers=max_workers)
+    return _PREFETCHER
@@ -1,39 +1,148 @@
 # imports
-import yfinance as yf
 import streamlit as st
 import datetime 
-import pandas as pd
-import cufflinks as cf
-from plotly.offline import iplot
+import hashlib
+import os
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from chapter_5_utils import (EXPORT_DIR, EXPORT_FORMATS, ttl_lru_cache,
+                             export_prices, remove_export, sweep_exports,
+                             get_data_provider,
+                             get_prefetcher, sma, bollinger_bands, rsi,
+                             downsample_series, downsample_ohlcv)
 
-## set offline mode for cufflinks
-cf.go_offline()
+# maximum number of points of each trace sent to the browser
+MAX_POINTS = 1000
+# number of the most viewed tickers, whose prices are loaded in the background
+N_PREFETCHED = 5
+# time (in seconds) after which the exported files are removed
+EXPORT_TTL = 60 * 60
 
-# data functions
-@st.cache
+# the data comes from the local fixtures if DASHBOARD_FIXTURE_DIR is set
+# (for offline runs) and from Wikipedia/Yahoo Finance otherwise
+provider = get_data_provider()
+# bounded pool of threads loading the data in the background, shared by the
+# reruns and sessions
+prefetcher = get_prefetcher()
+
+# data functions (cached across the reruns and sessions, keyed only by
+# hashable arguments, with a bounded size and an expiry)
+@ttl_lru_cache(max_size=1, ttl=24 * 60 * 60)
 def get_sp500_components():
-    df = pd.read_html("https://en.wikipedia.org/wiki/List_of_S%26P_500_companies")
-    df = df[0]
+    df = provider.get_sp500_components()
     tickers = df["Symbol"].to_list()
     tickers_companies_dict = dict(
         zip(df["Symbol"], df["Security"])
     )
     return tickers, tickers_companies_dict
 
-@st.cache
+@ttl_lru_cache(max_size=64, ttl=60 * 60)
 def load_data(symbol, start, end):
-    return yf.download(symbol, start, end)
+    return provider.get_prices(symbol, start, end)
+
+@ttl_lru_cache(max_size=16, ttl=EXPORT_TTL, on_evict=remove_export,
+               is_valid=os.path.exists)
+def export_data(symbol, start, end, columns, fmt):
+    # the exported file is written in chunks to disk once per
+    # (ticker, range, columns, format) and only its path is cached. The
+    # file is removed together with its cache entry and recreated if it was
+    # removed by someone else, while the files of the previous runs of the
+    # app are swept by age
+    sweep_exports(EXPORT_TTL)
+    columns_hash = hashlib.md5(",".join(columns).encode()).hexdigest()[:8]
+    path = os.path.join(
+        EXPORT_DIR,
+        f"{symbol}_{start}_{end}_{columns_hash}{EXPORT_FORMATS[fmt][0]}"
+    )
+    df = load_data(symbol, start, end)
+    return export_prices(df[list(columns)], path, fmt)
+
+@ttl_lru_cache(max_size=128, ttl=60 * 60)
+def get_indicator(symbol, start, end, name, params):
+    # each indicator is computed on the full data only when it is enabled
+    # and reused by all the figures using it
+    close = load_data(symbol, start, end)["Close"]
+    indicator_funcs = {"sma": sma, "bb": bollinger_bands, "rsi": rsi}
+    return indicator_funcs[name](close, *params)
+
+@ttl_lru_cache(max_size=32, ttl=60 * 60)
+def build_figure(symbol, start, end, title, volume_flag,
+                 sma_params, bb_params, rsi_params):
+    # the parameters of the disabled indicators are None, so changing them
+    # does not invalidate the cached figure
+    df = load_data(symbol, start, end)
+    df_plot = downsample_ohlcv(df, MAX_POINTS)
+
+    n_rows = 1 + volume_flag + (rsi_params is not None)
+    # the price takes the whole figure or 60% of it, when there are
+    # additional rows for the volume and the RSI
+    row_heights = ([0.6] + [0.4 / (n_rows - 1)] * (n_rows - 1)
+                   if n_rows > 1 else [1.0])
+    fig = make_subplots(rows=n_rows, cols=1, shared_xaxes=True,
+                        vertical_spacing=0.03, row_heights=row_heights)
+    fig.add_trace(go.Candlestick(x=df_plot.index, open=df_plot["Open"],
+                                 high=df_plot["High"], low=df_plot["Low"],
+                                 close=df_plot["Close"], name=symbol),
+                  row=1, col=1)
+
+    if sma_params is not None:
+        sma_line = downsample_series(
+            get_indicator(symbol, start, end, "sma", sma_params), MAX_POINTS
+        )
+        fig.add_trace(go.Scatter(x=sma_line.index, y=sma_line, mode="lines",
+                                 name=f"SMA({sma_params[0]})"),
+                      row=1, col=1)
+    if bb_params is not None:
+        bands = get_indicator(symbol, start, end, "bb", bb_params)
+        for band_name in bands.columns:
+            band = downsample_series(bands[band_name], MAX_POINTS)
+            fig.add_trace(go.Scatter(x=band.index, y=band, mode="lines",
+                                     line=dict(dash="dot", width=1),
+                                     name=f"BB {band_name}"),
+                          row=1, col=1)
+
+    row = 2
+    if volume_flag:
+        fig.add_trace(go.Bar(x=df_plot.index, y=df_plot["Volume"],
+                             name="Volume"),
+                      row=row, col=1)
+        row += 1
+    if rsi_params is not None:
+        rsi_line = downsample_series(
+            get_indicator(symbol, start, end, "rsi", rsi_params[:1]),
+            MAX_POINTS
+        )
+        fig.add_trace(go.Scatter(x=rsi_line.index, y=rsi_line, mode="lines",
+                                 name=f"RSI({rsi_params[0]})"),
+                      row=row, col=1)
+        for level in rsi_params[1:]:
+            fig.add_hline(y=level, line_dash="dash", row=row, col=1)
+
+    fig.update_layout(title=title, xaxis_rangeslider_visible=False,
+                      height=400 + 150 * (n_rows - 1))
+    return fig
 
-@st.cache
-def convert_df_to_csv(df):
-    return df.to_csv().encode("utf-8")
+# the list of the constituents is loaded in the background (or taken from
+# the cache), while the title and the manual are already shown
+components_future = prefetcher.submit(get_sp500_components)
+
+st.title("A simple web app for technical analysis")
+st.write("""
+### User manual
+* you can select any of the companies that is a component of the S&P index
+* you can select the time period of your interest
+* you can download the selected data as a CSV file
+* you can add the following Technical Indicators to the plot: Simple Moving 
+Average, Bollinger Bands, Relative Strength Index
+* you can experiment with different parameters of the indicators
+""")
 
 # sidebar
 
 ## inputs for downloading data
 st.sidebar.header("Stock Parameters")
 
-available_tickers, tickers_companies_dict = get_sp500_components()
+available_tickers, tickers_companies_dict = components_future.result()
 
 ticker = st.sidebar.selectbox(
     "Ticker", 
@@ -96,18 +205,14 @@ rsi_lower= exp_rsi.number_input(label="RSI Lower",
 
 # main body
 
-st.title("A simple web app for technical analysis")
-st.write("""
-### User manual
-* you can select any of the companies that is a component of the S&P index
-* you can select the time period of your interest
-* you can download the selected data as a CSV file
-* you can add the following Technical Indicators to the plot: Simple Moving 
-Average, Bollinger Bands, Relative Strength Index
-* you can experiment with different parameters of the indicators
-""")
+# a view is counted only when the ticker is selected, not on every rerun
+# caused by the other widgets
+if st.session_state.get("last_ticker") != ticker:
+    prefetcher.record_view(ticker)
+    st.session_state["last_ticker"] = ticker
 
-df = load_data(ticker, start_date, end_date)
+# waits for the background task if the ticker is being prefetched
+df =prefetcher.result(load_data, ticker, start_date, end_date)
 
 ## data preview part
 data_exp = st.expander("Preview data")
@@ -119,29 +224,36 @@ columns_to_show = data_exp.multiselect(
 )
 data_exp.dataframe(df[columns_to_show])
 
-csv_file = convert_df_to_csv(df[columns_to_show])
-data_exp.download_button(
-    label="Download selected as CSV",
-    data=csv_file,
-    file_name=f"{ticker}_stock_prices.csv",
-    mime="text/csv",
-)
+# the file is only exported (and read by the download button) once the
+# user asks for it, until the selection changes or it is downloaded
+export_format = data_exp.selectbox("Format", list(EXPORT_FORMATS))
+export_args = (ticker, start_date, end_date, tuple(columns_to_show),
+               export_format)
+if data_exp.button("Export selected"):
+    st.session_state["export_args"] = export_args
+if st.session_state.get("export_args") == export_args:
+    extension, mime = EXPORT_FORMATS[export_format]
+    with open(export_data(*export_args), "rb") as export_file:
+        downloaded = data_exp.download_button(
+            label="Download selected",
+            data=export_file,
+            file_name=f"{ticker}_stock_prices{extension}",
+            mime=mime,
+        )
+    if downloaded:
+        del st.session_state["export_args"]
 
 ## technical analysis plot
 title_str = f"{tickers_companies_dict[ticker]}'s stock price"
-qf = cf.QuantFig(df, title=title_str)
-if volume_flag:
-    qf.add_volume()
-if sma_flag:
-    qf.add_sma(periods=sma_periods)
-if bb_flag:
-    qf.add_bollinger_bands(periods=bb_periods,
-                           boll_std=bb_std)
-if rsi_flag:
-    qf.add_rsi(periods=rsi_periods,
-               rsi_upper=rsi_upper,
-               rsi_lower=rsi_lower,
-               showbands=True)
-
-fig = qf.iplot(asFigure=True)
-st.plotly_chart(fig)
\ No newline at end of file
+fig = build_figure(
+    ticker, start_date, end_date, title_str, volume_flag,
+    sma_params=(sma_periods,) if sma_flag else None,
+    bb_params=(bb_periods, bb_std) if bb_flag else None,
+    rsi_params=(rsi_periods, rsi_upper, rsi_lower) if rsi_flag else None,
+)
+st.plotly_chart(fig)
+
+# warm the cache with the prices of the most viewed tickers, so switching to
+# them does not wait on the network
+prefetcher.prefetch_most_viewed(load_data, start_date, end_date,
+                                n=N_PREFETCHED)
\ No newline at end of file
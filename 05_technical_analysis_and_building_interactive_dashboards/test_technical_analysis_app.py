@@ -0,0 +1,103 @@
+import datetime
+import os
+import runpy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("plotly")
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "technical_analysis_app.py")
+
+
+@pytest.fixture
+def fixture_dir(tmp_path, monkeypatch):
+    """
+    Directory with the offline data of the app (see `FixtureDataProvider`).
+    """
+    pd.DataFrame({"Symbol": ["AAA", "BBB"],
+                  "Security": ["AAA Inc.", "BBB Corp."]}) \
+        .to_csv(tmp_path / "sp500_components.csv", index=False)
+
+    rng = np.random.default_rng(42)
+    index = pd.bdate_range("2019-01-01", periods=500)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    for ticker in ["AAA", "BBB"]:
+        pd.DataFrame({"Open": close, "High": close * 1.01,
+                      "Low": close * 0.99, "Close": close,
+                      "Adj Close": close, "Volume": 1e6},
+                     index=index).to_parquet(tmp_path / f"{ticker}.parquet")
+
+    # the directories are read by `chapter_5_utils` once imported, so they
+    # are patched on the module as well as in the environment
+    import chapter_5_utils
+    for name, path in [("PRICE_STORE_DIR", tmp_path / "price_store"),
+                       ("EXPORT_DIR", tmp_path / "exports")]:
+        monkeypatch.setenv(name, str(path))
+        monkeypatch.setattr(chapter_5_utils, name, str(path))
+    monkeypatch.setenv("DASHBOARD_FIXTURE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_app_renders_with_default_inputs(fixture_dir):
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+
+    assert not at.exception
+
+
+def test_app_renders_with_all_indicators(fixture_dir):
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    for checkbox in at.checkbox:
+        checkbox.check()
+    at.run()
+
+    assert not at.exception
+
+
+def test_build_figure_without_indicators(fixture_dir):
+    app = runpy.run_path(APP_PATH)
+
+    fig = app["build_figure"](
+        "AAA", datetime.date(2019, 1, 1), datetime.date(2020, 1, 1),
+        "AAA Inc.'s stock price", False,
+        sma_params=None, bb_params=None, rsi_params=None,
+    )
+
+    assert len(fig.data) == 1
+    assert fig.data[0].type == "candlestick"
+
+
+def test_export_only_after_request(fixture_dir):
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    export_dir = fixture_dir / "exports"
+    files_before = set(os.listdir(export_dir)) if export_dir.is_dir() \
+        else set()
+    assert "export_args" not in at.session_state
+
+    at.button[0].click().run()
+
+    assert not at.exception
+    assert "export_args" in at.session_state
+    new_files = set(os.listdir(export_dir)) - files_before
+    assert len(new_files) == 1
+    assert new_files.pop().endswith(".csv")
+
+
+def test_view_counted_only_when_ticker_changes(fixture_dir, monkeypatch):
+    import chapter_5_utils
+
+    views = []
+    monkeypatch.setattr(chapter_5_utils.DataPrefetcher, "record_view",
+                        lambda self, ticker: views.append(ticker))
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    at.checkbox[0].check().run()
+    at.sidebar.selectbox[0].select("BBB").run()
+
+    assert not at.exception
+    assert views == ["AAA", "BBB"]
@@ -1,8 +1,10 @@
 # import libraries 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
 from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
-from statsmodels.tsa.stattools import adfuller, kpss
+from statsmodels.tsa.stattools import acovf, adfuller, kpss, levinson_durbin
 from statsmodels.tools.sm_exceptions import InterpolationWarning
 import warnings
 
@@ -113,4 +115,155 @@ def test_autocorrelation(x, n_lags=40, alpha=0.05, h0_type='c'):
 
     return fig
 
-    
+
+def acf_pacf_fft(x, n_lags=40):
+    '''
+    Function for calculating the ACF and PACF values of a series without
+    plotting them. The autocovariances are calculated via FFT and the PACF
+    is obtained from them with the Levinson-Durbin recursion, which matches
+    the default (Yule-Walker) method of `plot_pacf`.
+
+    Parameters
+    ----------
+    x : pd.Series / np.array
+        The time series
+    n_lags : int
+        The number of lags
+
+    Returns
+    -------
+    results : pd.DataFrame
+        A DataFrame with the ACF and PACF values, indexed by the lag
+    '''
+
+    autocov = acovf(np.asarray(x, dtype=float), fft=True, nlag=n_lags)
+    pacf_values = levinson_durbin(autocov, nlags=n_lags, isacov=True)[2]
+
+    return pd.DataFrame({'acf': autocov / autocov[0],
+                         'pacf': pacf_values},
+                        index=pd.RangeIndex(n_lags + 1, name='lag'))
+
+
+def _test_series(args):
+    '''
+    Helper running the ADF and KPSS tests (and optionally calculating the
+    ACF/PACF values) of a single series in a worker process. The errors
+    (for example, of too short series) are recorded instead of raised, so
+    they do not stop the whole batch.
+    '''
+
+    name, x, h0_type, n_lags = args
+    rows = []
+
+    for test_name, test_func in [('adf', adf_test),
+                                 ('kpss', lambda x: kpss_test(x, h0_type))]:
+        row = {'series': name, 'test': test_name}
+        try:
+            results = test_func(x)
+            row.update({
+                'test_statistic': results['Test Statistic'],
+                'p_value': results['p-value'],
+                'n_lags': results.iloc[2],
+                'n_obs': len(x),
+            })
+            row.update({key.replace('Critical Value ', 'critical_value_'): value
+                        for key, value in results.items()
+                        if key.startswith('Critical Value')})
+        except Exception as e:
+            row['error'] = f'{type(e).__name__}: {e}'
+        rows.append(row)
+
+    acf_results = None
+    if n_lags is not None:
+        try:
+            acf_results = acf_pacf_fft(x, n_lags=n_lags)
+            acf_results = acf_results.reset_index().assign(series=name)
+        except Exception:
+            acf_results = None
+
+    return rows, acf_results
+
+
+def batch_stationarity_test(data, h0_type='c', alpha=0.05, n_lags=None,
+                            n_workers=None, chunksize=16):
+    '''
+    Function for testing the stationarity of many series at once, with the
+    ADF and KPSS tests run in parallel on a pool of processes. The missing
+    values of each series are dropped before testing. Nothing is printed or
+    plotted, use `test_autocorrelation` for the plots of a single series.
+
+    Parameters
+    ----------
+    data : pd.DataFrame / dict
+        The time series to be checked for stationarity, either as the
+        columns of a DataFrame or as a dictionary of series/arrays
+    h0_type: str{'c', 'ct'}
+        Indicates the null hypothesis of the KPSS test:
+            * 'c': The data is stationary around a constant(default)
+            * 'ct': The data is stationary around a trend
+    alpha : float
+        Significance level used for the `stationary` column
+    n_lags : int
+        The number of lags of the ACF/PACF values. They are only calculated
+        (via FFT) when it is provided
+    n_workers : int
+        The number of processes, the default uses all the CPUs. With 1, the
+        tests are run in the current process
+    chunksize : int
+        The number of series sent to a worker process at once
+
+    Returns
+    -------
+    results : pd.DataFrame
+        A tidy DataFrame with one row per series and test, containing the
+        test statistic, the p-value, the number of lags and observations,
+        the critical values, the conclusion of the test at the `alpha`
+        significance level and the error message of the failed tests
+    acf_results : pd.DataFrame
+        Only returned when `n_lags` is provided. A tidy DataFrame with the
+        ACF and PACF values of each series and lag (without the series,
+        for which they could not be calculated)
+    '''
+
+    # both the DataFrames and the dictionaries are iterated with `items`
+    tasks = [(name, pd.Series(x).dropna().to_numpy(dtype=float), h0_type,
+              n_lags)
+             for name, x in data.items()]
+
+    if n_workers == 1:
+        outputs = list(map(_test_series, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            outputs = list(executor.map(_test_series, tasks,
+                                        chunksize=chunksize))
+
+    results = pd.DataFrame([row for rows, _ in outputs for row in rows])
+    if 'error' not in results:
+        results['error'] = None
+    # ADF rejects the null hypothesis of non-stationarity for low p-values,
+    # while KPSS rejects the null hypothesis of stationarity
+    stationary = np.where(results['test'] == 'adf',
+                          results['p_value'] < alpha,
+                          results['p_value'] >= alpha)
+    results['stationary'] = pd.Series(stationary, dtype='boolean').mask(
+        results['p_value'].isna()
+    )
+    critical_columns = sorted(
+        [col for col in results.columns if col.startswith('critical_value_')],
+        key=lambda col: float(col[len('critical_value_('):-len('%)')])
+    )
+    results = results[['series', 'test', 'test_statistic', 'p_value',
+                       'n_lags', 'n_obs', *critical_columns, 'stationary',
+                       'error']]
+
+    if n_lags is None:
+        return results
+
+    acf_frames = [acf_results for _, acf_results in outputs
+                  if acf_results is not None]
+    acf_results = (pd.concat(acf_frames, ignore_index=True)
+                   [['series', 'lag', 'acf', 'pacf']]
+                   if acf_frames else
+                   pd.DataFrame(columns=['series', 'lag', 'acf', 'pacf']))
+
+    return results, acf_results
@@ -0,0 +1,125 @@
+"""
+Optional numba-compiled kernels used by `chapter_10_utils`.
+
+When numba is not installed, `NUMBA_AVAILABLE` is False and the utilities
+fall back to their pure NumPy implementations.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+
+def gbm_paths_kernel(s_0, drift, diffusion, dW):
+    """
+    Kernel turning a matrix of Brownian increments into GBM paths in a single
+    pass, parallelized over the paths. It follows the convention of
+    `simulate_gbm`: the cumulative sum starts with the first column, which is
+    then overwritten with the initial price. The computations are done in
+    place, so `dW` is overwritten and no temporary matrices are allocated.
+
+    Parameters
+    ------------
+    s_0 : float
+        Initial stock price
+    drift : float
+        Drift of the log price per time increment, (mu - sigma^2 / 2) * dt
+    diffusion : float
+        Diffusion coefficient (sigma)
+    dW : np.ndarray
+        Matrix (size: n_sims x (N+1)) of Brownian increments
+
+    Returns
+    -----------
+    S_t : np.ndarray
+        The `dW` matrix filled with the simulated prices
+    """
+    n_sims, n_steps = dW.shape
+
+    for i in prange(n_sims):
+        log_price = 0.0
+        for j in range(n_steps):
+            log_price += drift + diffusion * dW[i, j]
+            dW[i, j] = s_0 * np.exp(log_price)
+        dW[i, 0] = s_0
+
+    return dW
+
+
+def lsmc_backward_induction_kernel(gbm_simulations, K, discount_factor,
+                                   is_call, poly_degree, is_laguerre):
+    """
+    Kernel running the backward induction of the Longstaff-Schwartz algorithm
+    using the in-the-money paths only. It mirrors
+    `chapter_10_utils._lsmc_backward_induction`, while the payoffs, the
+    regressors and the exercise decisions are computed in loops parallelized
+    over the paths.
+
+    Returns
+    -----------
+    cash_flows : np.ndarray
+        Vector (size: n_sims) of the cash flows discounted to the first time
+        step (column 1 of `gbm_simulations`)
+    """
+    n_sims, n_steps = gbm_simulations.shape
+    sign = 1.0 if is_call else -1.0
+
+    cash_flows = np.empty(n_sims)
+    payoff = np.empty(n_sims)
+    design_matrix = np.empty((n_sims, poly_degree + 1))
+
+    for i in prange(n_sims):
+        cash_flows[i] = max(sign * (gbm_simulations[i, n_steps - 1] - K), 0.0)
+
+    for t in range(n_steps - 2, 0, -1):
+        for i in prange(n_sims):
+            cash_flows[i] *= discount_factor
+            payoff[i] = max(sign * (gbm_simulations[i, t] - K), 0.0)
+
+        itm_ind = np.flatnonzero(payoff > 0)
+        n_itm = len(itm_ind)
+        if n_itm <= poly_degree:
+            continue
+
+        # regress on the moneyness for numerical stability
+        y = np.empty(n_itm)
+        for k in prange(n_itm):
+            i = itm_ind[k]
+            x = gbm_simulations[i, t] / K
+            y[k] = cash_flows[i]
+            design_matrix[k, 0] = 1.0
+            if poly_degree > 0:
+                design_matrix[k, 1] = 1.0 - x if is_laguerre else x
+            for d in range(1, poly_degree):
+                if is_laguerre:
+                    design_matrix[k, d + 1] = (
+                        (2 * d + 1 - x) * design_matrix[k, d]
+                        - d * design_matrix[k, d - 1]
+                    ) / (d + 1)
+                else:
+                    design_matrix[k, d + 1] = design_matrix[k, d] * x
+
+        X = design_matrix[:n_itm]
+        coefs = np.linalg.lstsq(X, y, rcond=-1.0)[0]
+
+        for k in prange(n_itm):
+            i = itm_ind[k]
+            continuation_value = 0.0
+            for d in range(poly_degree + 1):
+                continuation_value += X[k, d] * coefs[d]
+            if payoff[i] > continuation_value:
+                cash_flows[i] = payoff[i]
+
+    return cash_flows
+
+
+if NUMBA_AVAILABLE:
+    gbm_paths_kernel = njit(parallel=True, cache=True)(gbm_paths_kernel)
+    lsmc_backward_induction_kernel = njit(parallel=True, cache=True)(
+        lsmc_backward_induction_kernel
+    )
@@ -1,8 +1,138 @@
+import multiprocessing
+import os
+import time
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
 from scipy.stats import norm
+from scipy.stats.qmc import Sobol
+
+from chapter_10_kernels import (NUMBA_AVAILABLE, gbm_paths_kernel, 
+                                lsmc_backward_induction_kernel)
+
+
+def get_rng(random_seed=42):
+    """
+    Function used for creating a random number generator from the provided seed.
+
+    Integers (and None) create a local `np.random.RandomState`, which produces
+    the same numbers as seeding the global state with `np.random.seed`, but 
+    without touching it. Hence, the results from the book are preserved, while
+    the simulations become thread-safe. Passing a `np.random.SeedSequence` 
+    or a `np.random.Generator` uses the modern generators instead.
+
+    Parameters
+    ------------
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility
+
+    Returns
+    -----------
+    rng : np.random.RandomState or np.random.Generator
+        Random number generator
+    """
+
+    if random_seed is None or isinstance(random_seed, (int, np.integer)):
+        return np.random.RandomState(random_seed)
+    if isinstance(random_seed, (np.random.Generator, np.random.RandomState)):
+        return random_seed
+    if isinstance(random_seed, (np.random.SeedSequence, 
+                                np.random.BitGenerator)):
+        return np.random.default_rng(random_seed)
+    raise ValueError("Wrong input for random_seed!")
+
+
+def get_seed_sequence(random_seed=42):
+    """
+    Function used for creating a `np.random.SeedSequence`, which can spawn 
+    independent child streams (for example, one per chunk or per worker).
+
+    Parameters
+    ------------
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility. The entropy of a generator is drawn
+        from it, so its state advances.
+
+    Returns
+    -----------
+    seed_seq : np.random.SeedSequence
+        The seed sequence
+    """
+
+    if isinstance(random_seed, np.random.SeedSequence):
+        return random_seed
+    if isinstance(random_seed, np.random.Generator):
+        return np.random.SeedSequence(
+            random_seed.integers(0, 2 ** 63, size=4).tolist()
+        )
+    if random_seed is None or isinstance(random_seed, (int, np.integer)):
+        return np.random.SeedSequence(random_seed)
+    raise ValueError("Wrong input for random_seed!")
+
 
+def _sobol_normals(n_sims, dim, random_seed=42):
+    """
+    Helper function drawing standard normal variables from a scrambled Sobol
+    sequence. The first dimensions have the best uniformity properties, so 
+    they should be used for the most important random variables.
+    """
+
+    sampler = Sobol(d=dim, scramble=True, 
+                    seed=np.random.default_rng(get_seed_sequence(random_seed)))
+
+    with warnings.catch_warnings():
+        # the balance properties hold only for sample sizes of powers of 2
+        warnings.simplefilter("ignore", category=UserWarning)
+        u = sampler.random(n_sims)
 
-def simulate_gbm(s_0, mu, sigma, n_sims, T, N, random_seed=42, antithetic_var=False):
+    eps = np.finfo(float).eps
+    return ndtri(np.clip(u, eps, 1 - eps))
+
+
+def _brownian_bridge(Z, times):
+    """
+    Helper function constructing Brownian motion paths at the given `times` 
+    from standard normal variables using the Brownian bridge. The first 
+    column of `Z` determines the terminal value and the following ones fill
+    in the midpoints of the already constructed intervals, so most of the 
+    variance of the paths is driven by the first dimensions of `Z`.
+    """
+
+    n_sims, M = Z.shape
+
+    # point 0 corresponds to time 0, when the process is equal to 0
+    t = np.concatenate(([0.0], times))
+    W = np.zeros((n_sims, M + 1))
+    W[:, M] = np.sqrt(t[M]) * Z[:, 0]
+
+    z_ind = 1
+    intervals = deque([(0, M)])
+    while intervals:
+        left, right = intervals.popleft()
+        if right - left < 2:
+            continue
+        mid = (left + right) // 2
+        
+        weight_left = (t[right] - t[mid]) / (t[right] - t[left])
+        weight_right = (t[mid] - t[left]) / (t[right] - t[left])
+        std = np.sqrt((t[mid] - t[left]) * (t[right] - t[mid]) 
+                      / (t[right] - t[left]))
+        W[:, mid] = (weight_left * W[:, left] + weight_right * W[:, right] 
+                     + std * Z[:, z_ind])
+        z_ind += 1
+
+        intervals.append((left, mid))
+        intervals.append((mid, right))
+
+    return W[:, 1:]
+
+
+def simulate_gbm(s_0, mu, sigma, n_sims, T, N, random_seed=42, 
+                 antithetic_var=False, qmc=False, use_numba=False):
     """
     Function used for simulating stock returns using Geometric Brownian Motion.
     
@@ -22,10 +152,18 @@ def simulate_gbm(s_0, mu, sigma, n_sims, T, N, random_seed=42, antithetic_var=Fa
         Length of the forecast horizon, same unit as dt
     N : int
         Number of time increments in the forecast horizon
-    random_seed : int
-        Random seed for reproducibility
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_rng` for details
     antithetic_var : bool
         Boolean whether to use antithetic variates approach to reduce variance
+    qmc : bool
+        Boolean whether to use quasi-Monte Carlo, that is scrambled Sobol 
+        sequences with the Brownian bridge construction of the paths. The
+        Sobol sequences work best for `n_sims` equal to a power of 2.
+    use_numba : bool
+        Boolean whether to build the paths from the increments using the 
+        compiled kernel, which works in place and in parallel. Falls back to
+        NumPy when numba is not installed.
 
     Returns
     -----------
@@ -34,26 +172,410 @@ def simulate_gbm(s_0, mu, sigma, n_sims, T, N, random_seed=42, antithetic_var=Fa
         Rows respresent sample paths, while columns point of time.
     """
     
-    np.random.seed(random_seed)
+    rng = get_rng(random_seed)
     
     # time increment
     dt = T/N
     
     # Brownian
+    n_draws = int(n_sims/2) if antithetic_var else n_sims
+    if qmc:
+        W = _brownian_bridge(_sobol_normals(n_draws, N + 1, random_seed), 
+                             dt * np.arange(1, N + 2))
+        dW = np.diff(W, axis=1, prepend=0)
+    else:
+        dW = rng.normal(scale = np.sqrt(dt), 
+                        size=(n_draws, N + 1))
+
     if antithetic_var:
-        dW_ant = np.random.normal(scale = np.sqrt(dt), 
-                                  size=(int(n_sims/2), N + 1))
-        dW = np.concatenate((dW_ant, -dW_ant), axis=0)
-    else: 
-        dW = np.random.normal(scale = np.sqrt(dt), 
-                              size=(n_sims, N + 1))
+        dW = np.concatenate((dW, -dW), axis=0)
   
     # simulate the evolution of the process
+    if use_numba and NUMBA_AVAILABLE:
+        return gbm_paths_kernel(s_0, (mu - 0.5 * sigma ** 2) * dt, sigma, dW)
+
     S_t = s_0 * np.exp(np.cumsum((mu - 0.5 * sigma ** 2) * dt + sigma * dW, axis=1)) 
     S_t[:, 0] = s_0
     
     return S_t
 
+
+def _gbm_paths_from_increments(s_0, mu, sigma, dt, dW):
+    """
+    Helper function turning a matrix of Brownian increments into GBM paths.
+    The computations are done in place, so `dW` is overwritten and returned
+    as the matrix of simulated prices.
+    """
+    dW *= sigma
+    dW += (mu - 0.5 * sigma ** 2) * dt
+    np.cumsum(dW, axis=1, out=dW)
+    np.exp(dW, out=dW)
+    dW *= s_0
+    dW[:, 0] = s_0
+
+    return dW
+
+
+def simulate_gbm_chunks(s_0, mu, sigma, n_sims, T, N, chunk_size=10_000,
+                        random_seed=42, antithetic_var=False,
+                        block_size=1_000):
+    """
+    Generator yielding Geometric Brownian Motion paths in chunks, so that
+    the memory footprint is bounded by `chunk_size` paths instead of `n_sims`.
+
+    The paths are split into consecutive blocks of `block_size` paths and 
+    each block is drawn from its own random stream, spawned from a 
+    `np.random.SeedSequence` initialized with `random_seed`. Thanks to that,
+    the concatenated output is identical for any value of `chunk_size`. 
+    The streams differ from the global one used by `simulate_gbm`, so the
+    paths are not the same as the ones returned by that function.
+
+    Statistics can be reduced incrementally over the chunks, for example:
+
+        payoff_sum = 0
+        for S_t in simulate_gbm_chunks(s_0, r, sigma, n_sims, T, N):
+            payoff_sum += np.maximum(S_t[:, -1] - K, 0).sum()
+        premium = np.exp(-r * T) * payoff_sum / n_sims
+    
+    Parameters
+    ------------
+    s_0 : float
+        Initial stock price
+    mu : float
+        Drift coefficient
+    sigma : float
+        Diffusion coefficient
+    n_sims : int
+        Total number of simulations paths
+    T : float
+        Length of the forecast horizon, same unit as dt
+    N : int
+        Number of time increments in the forecast horizon
+    chunk_size : int
+        Maximum number of paths in a single yielded chunk
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_seed_sequence` for details
+    antithetic_var : bool
+        Boolean whether to use antithetic variates approach to reduce variance.
+        The antithetic pairs are created within each block.
+    block_size : int
+        Number of paths drawn from a single random stream. Changing it 
+        changes the simulated paths.
+
+    Yields
+    -----------
+    S_t : np.ndarray
+        Matrix (size: chunk x (N+1)) containing the simulation results. 
+        Rows respresent sample paths, while columns point of time.
+    """
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive!")
+
+    # time increment
+    dt = T / N
+
+    def generate_block(n_paths, rng):
+        # Brownian
+        if antithetic_var:
+            dW_ant = rng.normal(scale=np.sqrt(dt), 
+                                size=(int(np.ceil(n_paths / 2)), N + 1))
+            dW = np.concatenate((dW_ant, -dW_ant), axis=0)[:n_paths]
+        else:
+            dW = rng.normal(scale=np.sqrt(dt), size=(n_paths, N + 1))
+
+        return _gbm_paths_from_increments(s_0, mu, sigma, dt, dW)
+
+    blocks = (generate_block(n_paths, rng) for n_paths, rng 
+              in _block_streams(n_sims, block_size, random_seed))
+    yield from _rechunk(blocks, chunk_size)
+
+
+def _block_streams(n_sims, block_size, random_seed):
+    """
+    Helper generator splitting `n_sims` paths into consecutive blocks of 
+    `block_size` paths and yielding the size of each block together with
+    its own random number generator, spawned from `random_seed`.
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be positive!")
+
+    n_blocks = int(np.ceil(n_sims / block_size))
+    block_seqs = get_seed_sequence(random_seed).spawn(n_blocks)
+
+    for block_ind, block_seq in enumerate(block_seqs):
+        n_paths = min(block_size, n_sims - block_ind * block_size)
+        yield n_paths, np.random.default_rng(block_seq)
+
+
+def _rechunk(blocks, chunk_size):
+    """
+    Helper generator regrouping arrays of paths (stacked along the first 
+    axis) into chunks of `chunk_size` paths. Only the last chunk can be 
+    smaller.
+    """
+    # buffered blocks waiting to be yielded
+    buffer = []
+    n_buffered = 0
+
+    for block in blocks:
+        buffer.append(block)
+        n_buffered += len(block)
+
+        # yield full chunks, keep the remainder for the next one
+        while n_buffered >= chunk_size:
+            paths = np.concatenate(buffer, axis=0)
+            yield paths[:chunk_size]
+            buffer = [paths[chunk_size:]]
+            n_buffered -= chunk_size
+
+    if n_buffered > 0:
+        yield np.concatenate(buffer, axis=0)
+
+
+_CHOLESKY_CACHE = OrderedDict()
+
+
+def get_cholesky_factor(corr_mat, max_cache_size=32):
+    """
+    Function used for calculating the lower-triangular Cholesky factor of a 
+    correlation (or covariance) matrix. The factors are stored in a bounded
+    LRU cache keyed by the contents of the matrix, so repeated simulations 
+    with the same correlation structure do not repeat the decomposition.
+    
+    Parameters
+    ------------
+    corr_mat : array-like
+        Symmetric, positive definite correlation matrix
+    max_cache_size : int
+        Maximum number of factors kept in the cache
+
+    Returns
+    -----------
+    chol_mat : np.ndarray
+        The (read-only) lower-triangular Cholesky factor
+    """
+
+    corr_mat = np.ascontiguousarray(corr_mat, dtype=float)
+    cache_key = (corr_mat.shape, corr_mat.tobytes())
+
+    if cache_key in _CHOLESKY_CACHE:
+        _CHOLESKY_CACHE.move_to_end(cache_key)
+        return _CHOLESKY_CACHE[cache_key]
+
+    chol_mat = np.linalg.cholesky(corr_mat)
+    chol_mat.flags.writeable = False
+    _CHOLESKY_CACHE[cache_key] = chol_mat
+    while len(_CHOLESKY_CACHE) > max_cache_size:
+        _CHOLESKY_CACHE.popitem(last=False)
+
+    return chol_mat
+
+
+def _correlated_gbm_block(s_0, mu, sigma, chol_mat, n_paths, dt, N, rng):
+    """
+    Helper function simulating a block of correlated GBM paths 
+    (size: n_paths x (N+1) x n_assets).
+    """
+    dW = rng.normal(scale=np.sqrt(dt), size=(n_paths, N, len(s_0))) @ chol_mat.T
+
+    S_t = np.empty((n_paths, N + 1, len(s_0)))
+    S_t[:, 0] = s_0
+    log_returns = (mu - 0.5 * sigma ** 2) * dt + sigma * dW
+    S_t[:, 1:] = s_0 * np.exp(np.cumsum(log_returns, axis=1))
+
+    return S_t
+
+
+def simulate_correlated_gbm(s_0, mu, sigma, corr_mat, n_sims, T, N, 
+                            random_seed=42, chunk_size=None, 
+                            block_size=1_000):
+    """
+    Function used for simulating the prices of multiple correlated assets 
+    using Geometric Brownian Motion. The correlation is introduced using the
+    (cached) Cholesky factor of the correlation matrix.
+
+    The paths are drawn in blocks with their own random streams (see 
+    `simulate_gbm_chunks`), so the results are identical regardless of 
+    `chunk_size`. The first column of each path contains the initial prices
+    and the following N columns are driven by one Brownian increment each.
+    
+    Parameters
+    ------------
+    s_0 : array-like
+        Initial stock prices
+    mu : array-like
+        Drift coefficients
+    sigma : array-like
+        Diffusion coefficients
+    corr_mat : array-like
+        Correlation matrix of the Brownian motions
+    n_sims : int
+        Number of simulations paths
+    T : float
+        Length of the forecast horizon, same unit as dt
+    N : int
+        Number of time increments in the forecast horizon
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_seed_sequence` for details
+    chunk_size : int
+        If provided, a generator yielding chunks of at most `chunk_size` 
+        paths is returned instead of a single array
+    block_size : int
+        Number of paths drawn from a single random stream. Changing it 
+        changes the simulated paths.
+
+    Returns
+    -----------
+    S_t : np.ndarray or generator
+        Array (size: n_sims x (N+1) x n_assets) containing the simulation 
+        results or a generator of such arrays with at most `chunk_size` paths
+    """
+
+    s_0, mu, sigma = (np.asarray(x, dtype=float) for x in (s_0, mu, sigma))
+    chol_mat = get_cholesky_factor(corr_mat)
+    if chol_mat.shape[0] != len(s_0):
+        raise ValueError("The size of corr_mat does not match the number of assets!")
+
+    # time increment
+    dt = T / N
+
+    blocks = (
+        _correlated_gbm_block(s_0, mu, sigma, chol_mat, n_paths, dt, N, rng)
+        for n_paths, rng in _block_streams(n_sims, block_size, random_seed)
+    )
+
+    if chunk_size is not None:
+        return _rechunk(blocks, chunk_size)
+    
+    return np.concatenate(list(blocks), axis=0)
+
+
+def portfolio_mc_var(s_0, mu, sigma, corr_mat, shares, n_sims, T, N=1, 
+                     alphas=(0.01, 0.05), random_seed=42, 
+                     chunk_size=10_000):
+    """
+    Function used for calculating the Value-at-Risk and the Expected 
+    Shortfall (CVaR) of a portfolio of correlated assets using Monte Carlo 
+    simulations.
+
+    The paths are simulated in chunks and each chunk is immediately reduced 
+    to the changes in the portfolio value at the end of the horizon. Only the
+    worst `ceil(max(alphas) * n_sims)` outcomes are kept between the chunks, 
+    which is all that is needed for the tail measures. VaR is defined as the 
+    k-th worst outcome with k = ceil(alpha * n_sims), and the Expected 
+    Shortfall as the average of the k worst outcomes, both reported as 
+    positive numbers for losses.
+    
+    Parameters
+    ------------
+    s_0 : array-like
+        Initial stock prices
+    mu : array-like
+        Drift coefficients
+    sigma : array-like
+        Diffusion coefficients
+    corr_mat : array-like
+        Correlation matrix of the Brownian motions
+    shares : array-like
+        Number of shares held of each asset
+    n_sims : int
+        Number of simulations paths
+    T : float
+        Length of the horizon of the VaR, same unit as dt
+    N : int
+        Number of time increments in the horizon
+    alphas : tuple
+        Tail probabilities, for example, 0.01 for the 99% VaR
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_seed_sequence` for details
+    chunk_size : int
+        Maximum number of paths simulated at once
+
+    Returns
+    -----------
+    results : pd.DataFrame
+        A DataFrame with the VaR and the Expected Shortfall for each of the
+        confidence levels (1 - alpha)
+    """
+
+    shares = np.asarray(shares, dtype=float)
+    P_0 = np.sum(shares * np.asarray(s_0, dtype=float))
+    n_tail = max(int(np.ceil(a * n_sims)) for a in alphas)
+
+    chunks = simulate_correlated_gbm(s_0=s_0, mu=mu, sigma=sigma, 
+                                     corr_mat=corr_mat, n_sims=n_sims, 
+                                     T=T, N=N, random_seed=random_seed, 
+                                     chunk_size=chunk_size)
+
+    worst_outcomes = np.empty(0)
+    for S_t in chunks:
+        P_diff = S_t[:, -1] @ shares - P_0
+        worst_outcomes = np.concatenate((worst_outcomes, P_diff))
+        if len(worst_outcomes) > n_tail:
+            worst_outcomes = np.partition(worst_outcomes, n_tail - 1)[:n_tail]
+
+    worst_outcomes = np.sort(worst_outcomes)
+
+    results = []
+    for alpha in alphas:
+        k = int(np.ceil(alpha * n_sims))
+        results.append({
+            "confidence_level": 1 - alpha,
+            "VaR": -worst_outcomes[k - 1],
+            "CVaR": -worst_outcomes[:k].mean(),
+        })
+
+    return pd.DataFrame(results).set_index("confidence_level")
+
+
+def simulate_gbm_terminal(s_0, mu, sigma, n_sims, T, random_seed=42, 
+                          antithetic_var=False, qmc=False):
+    """
+    Function used for simulating only the terminal stock prices of the
+    Geometric Brownian Motion. As the distribution of S_T is known in a closed
+    form, a single random draw per path is enough and the time grid is 
+    skipped entirely. Use it for path-independent payoffs, such as European 
+    options.
+    
+    Parameters
+    ------------
+    s_0 : float
+        Initial stock price
+    mu : float
+        Drift coefficient
+    sigma : float
+        Diffusion coefficient
+    n_sims : int
+        Number of simulations paths
+    T : float
+        Length of the forecast horizon
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_rng` for details
+    antithetic_var : bool
+        Boolean whether to use antithetic variates approach to reduce variance
+    qmc : bool
+        Boolean whether to use quasi-Monte Carlo (scrambled Sobol sequence)
+
+    Returns
+    -----------
+    S_T : np.ndarray
+        Vector (size: n_sims) containing the simulated terminal prices
+    """
+    
+    n_draws = int(n_sims/2) if antithetic_var else n_sims
+    if qmc:
+        rv = _sobol_normals(n_draws, 1, random_seed)[:, 0]
+    else:
+        rv = get_rng(random_seed).normal(0, 1, size=n_draws)
+
+    if antithetic_var:
+        rv = np.concatenate((rv, -rv))
+
+    S_T = s_0 * np.exp((mu - 0.5 * sigma ** 2) * T + sigma * np.sqrt(T) * rv)
+
+    return S_T
+
 def black_scholes_analytical(S_0, K, T, r, sigma, type="call"):
     """
     Function used for calculating the price of European options using the 
@@ -93,10 +615,402 @@ def black_scholes_analytical(S_0, K, T, r, sigma, type="call"):
     return option_premium
 
 
-def lsmc_american_option(S_0, K, T, N, r, sigma, n_sims, option_type, poly_degree, random_seed=42):
+def _get_call_flags(type):
+    """
+    Helper function converting the option type(s) into a boolean array
+    indicating the calls. Boolean arrays are returned as they are.
+    """
+    type = np.asarray(type)
+    if type.dtype == bool:
+        return type
+    is_call = type == "call"
+    if not np.all(is_call | (type == "put")):
+        raise ValueError("Wrong input for type!")
+    return is_call
+
+
+def black_scholes_greeks(S_0, K, T, r, sigma, type="call"):
+    """
+    Function used for calculating the prices and the Greeks of European 
+    options using the analytical form of the Black-Scholes model. All the 
+    inputs can be arrays (for example, a whole option chain), which are 
+    broadcast against each other and evaluated in a single vectorized pass.
+    
+    Parameters
+    ------------
+    S_0 : float or np.ndarray
+        Initial stock price
+    K : float or np.ndarray
+        Strike price
+    T : float or np.ndarray
+        Time to maturity in years
+    r : float or np.ndarray
+        Annualized risk-free rate
+    sigma : float or np.ndarray
+        Standard deviation of the stock returns
+    type : str or np.ndarray
+        Type of the option(s). Can be one of the following: ["call", "put"]
+    
+    Returns
+    -----------
+    results : dict
+        Dictionary with the arrays of the "price", "delta", "gamma", "vega", 
+        "theta" and "rho" of the options. Theta is expressed per year, vega
+        and rho per unit (not percentage point) change in the parameter.
+    """
+
+    S_0, K, T, r, sigma = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S_0, K, T, r, sigma))
+    )
+    is_call = _get_call_flags(type)
+
+    sqrt_T = np.sqrt(T)
+    sigma_sqrt_T = sigma * sqrt_T
+    d1 = (np.log(S_0 / K) + (r + 0.5 * sigma ** 2) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+
+    pdf_d1 = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+    discounted_K = K * np.exp(-r * T)
+
+    # use N(-x) = 1 - N(x) for the puts
+    sign = np.where(is_call, 1.0, -1.0)
+    N_d1 = ndtr(sign * d1)
+    N_d2 = ndtr(sign * d2)
+
+    results = {
+        "price": sign * (S_0 * N_d1 - discounted_K * N_d2),
+        "delta": sign * N_d1,
+        "gamma": pdf_d1 / (S_0 * sigma_sqrt_T),
+        "vega": S_0 * pdf_d1 * sqrt_T,
+        "theta": (-S_0 * pdf_d1 * sigma / (2 * sqrt_T) 
+                  - sign * r * discounted_K * N_d2),
+        "rho": sign * T * discounted_K * N_d2,
+    }
+
+    return results
+
+
+def implied_volatility(option_price, S_0, K, T, r, type="call", 
+                       sigma_0=0.2, tol=1e-8, max_iter=100, 
+                       sigma_bounds=(1e-6, 5.0)):
+    """
+    Function used for calculating the implied volatility of European options
+    using a vectorized, safeguarded Newton-Raphson method. 
+    
+    All the options are solved at once. For each of them, a bracket 
+    containing the solution is maintained and whenever a Newton step leaves
+    it (for example, due to a tiny vega of deep ITM/OTM options), a bisection
+    step is taken instead. This guarantees convergence, while keeping the 
+    quadratic convergence of Newton's method for the well-behaved options.
+    
+    Parameters
+    ------------
+    option_price : float or np.ndarray
+        Observed premium of the option
+    S_0 : float or np.ndarray
+        Initial stock price
+    K : float or np.ndarray
+        Strike price
+    T : float or np.ndarray
+        Time to maturity in years
+    r : float or np.ndarray
+        Annualized risk-free rate
+    type : str or np.ndarray
+        Type of the option(s). Can be one of the following: ["call", "put"]
+    sigma_0 : float or np.ndarray
+        Initial guess of the volatility
+    tol : float
+        Tolerance of the pricing error at which the solver stops
+    max_iter : int
+        Maximum number of iterations
+    sigma_bounds : tuple
+        Lower and upper bound of the searched volatility
+    
+    Returns
+    -----------
+    sigma : np.ndarray
+        The implied volatilities. NaN is returned for the prices violating
+        the no-arbitrage bounds or outside of `sigma_bounds`.
+    """
+
+    option_price, S_0, K, T, r, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) 
+          for x in (option_price, S_0, K, T, r)), 
+        _get_call_flags(type)
+    )
+    shape = option_price.shape
+    option_price, S_0, K, T, r, is_call = (
+        np.ravel(x) for x in (option_price, S_0, K, T, r, is_call)
+    )
+
+    lower = np.full(option_price.shape, sigma_bounds[0])
+    upper = np.full(option_price.shape, sigma_bounds[1])
+    sigma = np.clip(np.broadcast_to(sigma_0, shape), 
+                    *sigma_bounds).astype(float).ravel()
+
+    # prices outside of the attainable range have no solution
+    price_bounds = [
+        black_scholes_greeks(S_0, K, T, r, bound, is_call)["price"] 
+        for bound in sigma_bounds
+    ]
+    is_valid = ((option_price >= price_bounds[0]) 
+                & (option_price <= price_bounds[1]))
+    is_active = is_valid.copy()
+
+    for _ in range(max_iter):
+        if not is_active.any():
+            break
+
+        idx = np.nonzero(is_active)
+        greeks = black_scholes_greeks(S_0[idx], K[idx], T[idx], r[idx], 
+                                      sigma[idx], is_call[idx])
+        diff = greeks["price"] - option_price[idx]
+
+        converged = np.abs(diff) < tol
+        is_active[idx] = ~converged
+
+        # the price is increasing in sigma, so shrink the bracket
+        lower[idx] = np.where(diff < 0, sigma[idx], lower[idx])
+        upper[idx] = np.where(diff > 0, sigma[idx], upper[idx])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma_newton = sigma[idx] - diff / greeks["vega"]
+        use_bisection = ~((sigma_newton > lower[idx]) 
+                          & (sigma_newton < upper[idx]))
+        sigma_new = np.where(use_bisection, 
+                             0.5 * (lower[idx] + upper[idx]), 
+                             sigma_newton)
+        sigma[idx] = np.where(converged, sigma[idx], sigma_new)
+
+    sigma[~is_valid] = np.nan
+
+    return sigma.reshape(shape)[()]
+
+
+def _apply_control_variate(values, control, control_mean):
+    """
+    Helper function adjusting the simulated `values` using the `control` 
+    with the known expectation `control_mean`. The coefficient minimizing 
+    the variance is estimated from the same sample.
+    """
+    control_dev = control - control_mean
+    beta = np.dot(values - values.mean(), control_dev) / np.dot(control_dev, 
+                                                                control_dev)
+    return values - beta * control_dev
+
+
+def _mean_and_std_err(values, antithetic_var=False):
+    """
+    Helper function calculating the Monte Carlo estimate and its standard 
+    error. With antithetic variates, the pairs are averaged first, as they
+    are not independent.
+    """
+    if antithetic_var:
+        half = len(values) // 2
+        values = 0.5 * (values[:half] + values[half:2 * half])
+    return np.mean(values), np.std(values, ddof=1) / np.sqrt(len(values))
+
+
+def european_option_simulation(S_0, K, T, r, sigma, n_sims, 
+                               type="call", random_seed=42, 
+                               antithetic_var=False, qmc=False, 
+                               control_variate=False, 
+                               importance_sampling=False, 
+                               return_std_err=False):
+    """
+    Function used for calculating the price of European options using Monte 
+    Carlo simulations. Only the terminal prices are simulated.
+
+    Two additional variance reduction techniques are available:
+    * control variate - the discounted terminal stock price, whose 
+      expectation under the risk-neutral measure is equal to S_0
+    * importance sampling - the random draws are shifted so that the 
+      terminal prices are centered around the strike and the payoffs are 
+      reweighted by the likelihood ratio. It is most effective for deep 
+      out-of-the-money options, for which most plain paths end up worthless.
+    
+    Parameters
+    ------------
+    S_0 : float
+        Initial stock price
+    K : float
+        Strike price
+    T : float
+        Time to maturity in years
+    r : float
+        Annualized risk-free rate
+    sigma : float
+        Standard deviation of the stock returns
+    n_sims : int
+        Number of paths to simulate
+    type : str
+        Type of the option. Can be one of the following: ["call", "put"]
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_rng` for details
+    antithetic_var : bool
+        Boolean whether to use antithetic variates approach to reduce variance
+    qmc : bool
+        Boolean whether to use quasi-Monte Carlo (scrambled Sobol sequence)
+    control_variate : bool
+        Boolean whether to use the discounted stock price as a control variate
+    importance_sampling : bool
+        Boolean whether to use importance sampling
+    return_std_err : bool
+        Boolean whether to also return the standard error of the estimate. 
+        For quasi-Monte Carlo, the standard error is not a valid measure of
+        the accuracy, as the draws are not independent.
+        
+    Returns
+    -----------
+    option_premium : float
+        The premium on the option calculated using Monte Carlo simulations
+    std_err : float
+        The standard error of the premium, only if `return_std_err` is True
+    """
+
+    drift = (r - 0.5 * sigma ** 2) * T
+    discount_factor = np.exp(-r * T)
+
+    # shift of the standard normal draws centering S_T around the strike
+    shift = (np.log(K / S_0) - drift) / (sigma * np.sqrt(T)) \
+        if importance_sampling else 0.0
+
+    S_T = simulate_gbm_terminal(s_0=S_0, mu=r + sigma * shift / np.sqrt(T), 
+                                sigma=sigma, n_sims=n_sims, T=T, 
+                                random_seed=random_seed, 
+                                antithetic_var=antithetic_var, qmc=qmc)
+
+    if type == "call":
+        payoff = np.maximum(0, S_T - K)
+    elif type == "put":
+        payoff = np.maximum(0, K - S_T)
+    else: 
+        raise ValueError("Wrong input for type!")
+
+    # likelihood ratio of the original and the shifted distribution
+    if importance_sampling:
+        shifted_rv = (np.log(S_T / S_0) - drift) / (sigma * np.sqrt(T))
+        weights = np.exp(-shift * shifted_rv + 0.5 * shift ** 2)
+    else:
+        weights = 1.0
+
+    values = discount_factor * payoff * weights
+    if control_variate:
+        values = _apply_control_variate(values, 
+                                        discount_factor * S_T * weights, 
+                                        S_0)
+
+    option_premium, std_err = _mean_and_std_err(values, antithetic_var)
+
+    if return_std_err:
+        return option_premium, std_err
+    return option_premium
+
+
+def _fill_polynomial_basis(x, poly_degree, basis, out):
+    """
+    Helper function filling the preallocated `out` matrix (size: 
+    len(x) x (poly_degree+1)) with the regressors of the LSMC algorithm.
+    """
+    out[:, 0] = 1.0
+    if poly_degree == 0:
+        return out
+
+    if basis == "monomial":
+        out[:, 1] = x
+        for k in range(2, poly_degree + 1):
+            np.multiply(out[:, k - 1], x, out=out[:, k])
+    elif basis == "laguerre":
+        # recurrence: (k+1) L_{k+1} = (2k+1-x) L_k - k L_{k-1}
+        out[:, 1] = 1.0 - x
+        for k in range(1, poly_degree):
+            out[:, k + 1] = ((2 * k + 1 - x) * out[:, k] 
+                             - k * out[:, k - 1]) / (k + 1)
+    else:
+        raise ValueError("Wrong input for basis!")
+
+    return out
+
+
+def _lsmc_backward_induction(gbm_simulations, K, discount_factor, 
+                             option_type, poly_degree, basis="monomial",
+                             use_numba=False):
+    """
+    Helper function running the backward induction of the Longstaff-Schwartz 
+    algorithm on already simulated paths. Only the vector of the discounted
+    cash flows is kept in memory and the continuation values are estimated 
+    using the in-the-money paths only. With `use_numba` (and numba 
+    installed), the compiled kernel is used instead.
+
+    Returns
+    -----------
+    cash_flows : np.ndarray
+        Vector (size: n_sims) of the cash flows discounted to the first time 
+        step (column 1 of `gbm_simulations`)
+    """
+
+    if option_type == "call":
+        get_payoff = lambda prices: np.maximum(prices - K, 0)
+    elif option_type == "put":
+        get_payoff = lambda prices: np.maximum(K - prices, 0)
+    else:
+        raise ValueError("Wrong input for option_type!")
+
+    if basis not in ["monomial", "laguerre"]:
+        raise ValueError("Wrong input for basis!")
+
+    if use_numba and NUMBA_AVAILABLE:
+        return lsmc_backward_induction_kernel(
+            np.ascontiguousarray(gbm_simulations, dtype=float), float(K), 
+            discount_factor, option_type == "call", poly_degree, 
+            basis == "laguerre"
+        )
+
+    n_sims, n_steps = gbm_simulations.shape
+    N = n_steps - 1
+
+    # workspace reused by the regressions in all time steps
+    design_matrix = np.empty((n_sims, poly_degree + 1))
+
+    cash_flows = get_payoff(gbm_simulations[:, -1])
+
+    for t in range(N - 1, 0, -1):
+        cash_flows *= discount_factor
+
+        payoff = get_payoff(gbm_simulations[:, t])
+        itm_ind = np.flatnonzero(payoff > 0)
+        if len(itm_ind) <= poly_degree:
+            continue
+
+        # regress on the moneyness for numerical stability
+        X = _fill_polynomial_basis(gbm_simulations[itm_ind, t] / K, 
+                                   poly_degree, basis,
+                                   out=design_matrix[:len(itm_ind)])
+        coefs = np.linalg.lstsq(X, cash_flows[itm_ind], rcond=None)[0]
+        continuation_value = X @ coefs
+
+        exercise_ind = itm_ind[payoff[itm_ind] > continuation_value]
+        cash_flows[exercise_ind] = payoff[exercise_ind]
+
+    return cash_flows
+
+
+def lsmc_american_option(S_0, K, T, N, r, sigma, n_sims, option_type, 
+                         poly_degree, random_seed=42, basis="monomial",
+                         qmc=False, control_variate=False, 
+                         return_std_err=False, use_numba=False):
     """
     Function used for calculating the price of American options using Least 
     Squares Monte Carlo algorithm of Longstaff and Schwartz (2001).
+
+    Following the original paper, the continuation value is estimated using 
+    only the paths that are in the money at a given time step. Instead of 
+    the full payoff and value matrices, only a single vector of cash flows
+    is carried through the backward induction.
+
+    Optionally, the European option with the same parameters is used as a 
+    control variate, as its exact price is known from the Black-Scholes 
+    formula and it is highly correlated with the American one.
     
     Parameters
     ------------
@@ -118,13 +1032,30 @@ def lsmc_american_option(S_0, K, T, N, r, sigma, n_sims, option_type, poly_degre
         Type of the option. Can be one of the following: ["call", "put"]
     poly_degree : int
         Degree of the polynomial to fit in the LSMC algorithm
-    random_seed : int
-        Random seed for reproducibility
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_rng` for details
+    basis : str
+        The polynomial basis of the regression, evaluated on the moneyness 
+        S_t / K. Can be one of the following: ["monomial", "laguerre"]
+    qmc : bool
+        Boolean whether to simulate the paths using quasi-Monte Carlo, see 
+        `simulate_gbm` for details
+    control_variate : bool
+        Boolean whether to use the European option as a control variate
+    return_std_err : bool
+        Boolean whether to also return the standard error of the estimate, 
+        which does not account for the error of the regressions
+    use_numba : bool
+        Boolean whether to use the compiled kernels for the simulation and 
+        the backward induction. Falls back to NumPy when numba is not 
+        installed.
         
     Returns
     -----------
     option_premium : float
         The premium on the option 
+    std_err : float
+        The standard error of the premium, only if `return_std_err` is True
     """
 
     dt = T / N
@@ -132,25 +1063,316 @@ def lsmc_american_option(S_0, K, T, N, r, sigma, n_sims, option_type, poly_degre
 
     gbm_simulations = simulate_gbm(s_0=S_0, mu=r, sigma=sigma, 
                                    n_sims=n_sims, T=T, N=N,
-                                   random_seed=random_seed)
+                                   random_seed=random_seed, qmc=qmc,
+                                   use_numba=use_numba)
 
-    if option_type == "call":
-        payoff_matrix = np.maximum(
-            gbm_simulations - K, np.zeros_like(gbm_simulations))
-    elif option_type == "put":
-        payoff_matrix = np.maximum(
-            K - gbm_simulations, np.zeros_like(gbm_simulations))
+    cash_flows = _lsmc_backward_induction(gbm_simulations, K, discount_factor,
+                                          option_type, poly_degree, basis,
+                                          use_numba)
+    values = cash_flows * discount_factor
 
-    value_matrix = np.zeros_like(payoff_matrix)
-    value_matrix[:, -1] = payoff_matrix[:, -1]
+    if control_variate:
+        # the last column of the paths is driven by N+1 Brownian increments
+        # (see simulate_gbm), so the expectation of the European payoff 
+        # discounted by N steps is priced with the maturity of T + dt
+        if option_type == "call":
+            european_payoff = np.maximum(gbm_simulations[:, -1] - K, 0)
+        else:
+            european_payoff = np.maximum(K - gbm_simulations[:, -1], 0)
+        european_premium = np.exp(r * dt) * black_scholes_analytical(
+            S_0=S_0, K=K, T=T + dt, r=r, sigma=sigma, type=option_type
+        )
+        values = _apply_control_variate(values, 
+                                        np.exp(-r * T) * european_payoff, 
+                                        european_premium)
 
-    for t in range(N - 1, 0, -1):
-        regression = np.polyfit(
-            gbm_simulations[:, t], value_matrix[:, t + 1] * discount_factor, poly_degree)
-        continuation_value = np.polyval(regression, gbm_simulations[:, t])
-        value_matrix[:, t] = np.where(payoff_matrix[:, t] > continuation_value,
-                                      payoff_matrix[:, t],
-                                      value_matrix[:, t + 1] * discount_factor)
-
-    option_premium = np.mean(value_matrix[:, 1] * discount_factor)
+    option_premium, std_err = _mean_and_std_err(values)
+
+    if return_std_err:
+        return option_premium, std_err
     return option_premium
+
+
+_GBM_PATHS_CACHE = OrderedDict()
+
+
+def clear_gbm_paths_cache():
+    """
+    Function used for removing all the paths cached by 
+    `lsmc_american_option_batch`.
+    """
+    _GBM_PATHS_CACHE.clear()
+
+
+def lsmc_american_option_batch(S_0, K, T, N, r, sigma, n_sims, option_type, 
+                               poly_degree, random_seed=42, 
+                               basis="monomial", qmc=False, 
+                               use_cache=False, max_cache_size=4, 
+                               use_numba=False):
+    """
+    Function used for calculating the prices of multiple American options on
+    the same underlying (for example, different strikes) using the Least 
+    Squares Monte Carlo algorithm. The GBM paths are simulated only once and
+    shared by all the contracts.
+
+    With `use_cache=True`, the simulated paths are stored in a module-level 
+    LRU cache keyed by (S_0, r, sigma, T, N, n_sims, random_seed, qmc), so 
+    repeated calls with the same market data (for example, intraday 
+    repricing) skip the simulation. Only integer seeds can be cached, as 
+    generators and seed sequences change their state when used.
+    
+    Parameters
+    ------------
+    S_0 : float
+        Initial stock price
+    K : float or array-like
+        Strike prices
+    T : float
+        Time to maturity in years
+    N : int
+        Number of time increments in the forecast horizon
+    r : float
+        Annualized risk-free rate
+    sigma : float
+        Standard deviation of the stock returns
+    n_sims : int
+        Number of paths to simulate
+    option_type : str or array-like
+        Type of the options. Can be one of the following: ["call", "put"]
+    poly_degree : int
+        Degree of the polynomial to fit in the LSMC algorithm
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility, see `get_rng` for details
+    basis : str
+        The polynomial basis of the regression, evaluated on the moneyness 
+        S_t / K. Can be one of the following: ["monomial", "laguerre"]
+    qmc : bool
+        Boolean whether to simulate the paths using quasi-Monte Carlo, see 
+        `simulate_gbm` for details
+    use_cache : bool
+        Boolean whether to reuse the cached paths
+    max_cache_size : int
+        Maximum number of path matrices kept in the cache
+    use_numba : bool
+        Boolean whether to use the compiled kernels for the simulation and 
+        the backward induction. Falls back to NumPy when numba is not 
+        installed.
+        
+    Returns
+    -----------
+    option_premia : np.ndarray
+        The premia on the options, broadcast to the shape of `K` and 
+        `option_type`
+    """
+
+    K, option_type = np.broadcast_arrays(np.asarray(K, dtype=float), 
+                                         np.asarray(option_type))
+
+    dt = T / N
+    discount_factor = np.exp(-r * dt)
+
+    cache_key = (S_0, r, sigma, T, N, n_sims, random_seed, qmc)
+    is_cacheable = use_cache and isinstance(random_seed, (int, np.integer))
+
+    if is_cacheable and cache_key in _GBM_PATHS_CACHE:
+        _GBM_PATHS_CACHE.move_to_end(cache_key)
+        gbm_simulations = _GBM_PATHS_CACHE[cache_key]
+    else:
+        gbm_simulations = simulate_gbm(s_0=S_0, mu=r, sigma=sigma, 
+                                       n_sims=n_sims, T=T, N=N,
+                                       random_seed=random_seed, qmc=qmc,
+                                       use_numba=use_numba)
+        if is_cacheable:
+            # the paths are shared, so protect them from modifications
+            gbm_simulations.flags.writeable = False
+            _GBM_PATHS_CACHE[cache_key] = gbm_simulations
+            while len(_GBM_PATHS_CACHE) > max_cache_size:
+                _GBM_PATHS_CACHE.popitem(last=False)
+
+    option_premia = np.empty(K.shape)
+    for ind in np.ndindex(K.shape):
+        cash_flows = _lsmc_backward_induction(gbm_simulations, K[ind], 
+                                              discount_factor, 
+                                              option_type[ind], 
+                                              poly_degree, basis, use_numba)
+        option_premia[ind] = np.mean(cash_flows * discount_factor)
+
+    return option_premia
+
+
+def combine_estimates(results, shard_sizes):
+    """
+    Function used for merging the (premium, standard error) tuples of the 
+    shards of `run_mc_in_parallel`, for example, of the pricers called with
+    `return_std_err=True`. The premia are averaged using the shard sizes as 
+    weights and, as the shards are independent, the standard error of the 
+    average is sqrt(sum(w_i^2 * se_i^2)).
+
+    Parameters
+    ------------
+    results : list
+        The (premium, standard error) tuples of the shards
+    shard_sizes : np.ndarray
+        Number of paths of each shard
+
+    Returns
+    -----------
+    premium : float
+        The merged premium
+    std_err : float
+        Its standard error
+    """
+
+    premia, std_errs = map(np.asarray, zip(*results))
+    weights = np.asarray(shard_sizes) / np.sum(shard_sizes)
+    premium = np.tensordot(weights, premia, axes=1)
+    std_err = np.sqrt(np.tensordot(weights ** 2, std_errs ** 2, axes=1))
+    return premium, std_err
+
+
+def run_mc_in_parallel(func, n_sims, n_workers=None, n_shards=None, 
+                       random_seed=42, reduce=None, **kwargs):
+    """
+    Function used for running a Monte Carlo utility (for example, 
+    `simulate_gbm` or `lsmc_american_option`) on multiple processes.
+
+    The simulations are split into `n_shards` shards, each of them gets an 
+    independent child stream spawned from `random_seed`, and the shards are 
+    distributed over a pool of `n_workers` processes. The output depends only
+    on `n_shards`, not on the number of workers, so it is reproducible
+    regardless of the available cores. 
+
+    By default, array outputs (paths, terminal prices) are concatenated along
+    the first axis, while scalar outputs (premia) are averaged using the 
+    shard sizes as weights. For LSMC this means that each shard fits its own
+    regressions. Other outputs (for example, the (premium, standard error) 
+    tuples of the pricers called with `return_std_err=True`) require a 
+    `reduce` function, such as `combine_estimates`.
+
+    The workers are started with the "spawn" method, as forking a process
+    after the numba kernels (`use_numba=True`) started their threading layer
+    makes the interpreter hang at exit. Hence, `func` and `kwargs` have to be
+    picklable and scripts have to call it under `if __name__ == "__main__":`.
+
+    Parameters
+    ------------
+    func : callable
+        A module-level function accepting `n_sims` and `random_seed` arguments
+    n_sims : int
+        Total number of paths to simulate
+    n_workers : int
+        Number of worker processes, defaults to the number of CPUs
+    n_shards : int
+        Number of independent shards, defaults to `n_workers`
+    random_seed : int, np.random.SeedSequence or np.random.Generator
+        Random seed for reproducibility
+    reduce : callable
+        Function merging the list of the results of the shards, called as 
+        `reduce(results, shard_sizes)`. Defaults to None, which supports 
+        only scalar and array outputs
+    **kwargs
+        Remaining arguments passed to `func`
+
+    Returns
+    -----------
+    results : np.ndarray or float
+        The merged results of all the shards
+    """
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_shards is None:
+        n_shards = n_workers
+
+    shard_sizes = np.full(n_shards, n_sims // n_shards)
+    shard_sizes[:n_sims % n_shards] += 1
+    shard_sizes = shard_sizes[shard_sizes > 0]
+    shard_seqs = get_seed_sequence(random_seed).spawn(len(shard_sizes))
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [
+            executor.submit(func, n_sims=int(size), random_seed=seq, **kwargs)
+            for size, seq in zip(shard_sizes, shard_seqs)
+        ]
+        results = [future.result() for future in futures]
+
+    if reduce is not None:
+        return reduce(results, shard_sizes)
+    if not isinstance(results[0], (np.ndarray, np.generic, int, float)):
+        raise TypeError(
+            f"Cannot merge the results of type {type(results[0]).__name__}, "
+            "provide the `reduce` function (for example, `combine_estimates`)"
+        )
+    if np.ndim(results[0]) == 0:
+        return np.average(results, weights=shard_sizes)
+    
+    return np.concatenate(results, axis=0)
+
+
+def benchmark_mc_convergence(S_0, K, T, r, sigma, n_sims_list, n_reps=20, 
+                             type="call", random_seed=42):
+    """
+    Function used for comparing the convergence of the plain Monte Carlo, 
+    antithetic variates and quasi-Monte Carlo sampling. European options are
+    priced with `european_option_simulation` and the errors are measured 
+    against the analytical Black-Scholes price.
+    
+    Parameters
+    ------------
+    S_0 : float
+        Initial stock price
+    K : float
+        Strike price
+    T : float
+        Time to maturity in years
+    r : float
+        Annualized risk-free rate
+    sigma : float
+        Standard deviation of the stock returns
+    n_sims_list : list
+        List with the numbers of paths to evaluate
+    n_reps : int
+        Number of independent repetitions (seeds) per configuration
+    type : str
+        Type of the option. Can be one of the following: ["call", "put"]
+    random_seed : int
+        Random seed used for spawning the seeds of the repetitions
+        
+    Returns
+    -----------
+    results : pd.DataFrame
+        A DataFrame with the RMSE and the average wall time (in seconds) of 
+        each sampling method and number of paths
+    """
+
+    methods = {
+        "plain": dict(antithetic_var=False, qmc=False),
+        "antithetic": dict(antithetic_var=True, qmc=False),
+        "qmc": dict(antithetic_var=False, qmc=True),
+    }
+    true_premium = black_scholes_analytical(S_0=S_0, K=K, T=T, r=r, 
+                                            sigma=sigma, type=type)
+    rep_seqs = get_seed_sequence(random_seed).spawn(n_reps)
+
+    results = []
+    for method, settings in methods.items():
+        for n_sims in n_sims_list:
+            errors = np.empty(n_reps)
+            start = time.perf_counter()
+            for rep, seq in enumerate(rep_seqs):
+                premium = european_option_simulation(
+                    S_0=S_0, K=K, T=T, r=r, sigma=sigma, n_sims=n_sims, 
+                    type=type, random_seed=seq, **settings
+                )
+                errors[rep] = premium - true_premium
+            wall_time = (time.perf_counter() - start) / n_reps
+            results.append({
+                "method": method,
+                "n_sims": n_sims,
+                "rmse": np.sqrt(np.mean(errors ** 2)),
+                "wall_time": wall_time,
+            })
+
+    return pd.DataFrame(results)
@@ -0,0 +1,338 @@
+# Benchmark of the backtests of the strategies on synthetic OHLCV data
+#
+# Example (the report can be compared with the one from another commit):
+#   python benchmark.py --scenarios 1y 20y --assets 1 10 --output new.json
+#   python benchmark.py --compare old.json new.json
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from bollinger_bands_strategy import BollingerBandStrategy
+from mean_variance_strategy import (FractionalTradesCommission,
+                                    MeanVariancePortfStrategy)
+from panel_data import PricePanel
+from rsi_strategy import RsiSignalStrategy
+from sma_strategy import SmaStrategy
+
+try:
+    import talib  # noqa: F401  # required by `bt.talib`
+    HAS_TALIB = True
+except ImportError:
+    HAS_TALIB = False
+
+# sizes of the synthetic data: the number of bars and their frequency
+SCENARIOS = {
+    "1y": {"n_bars": 252, "freq": "B"},
+    "20y": {"n_bars": 20 * 252, "freq": "B"},
+    "minute": {"n_bars": 20 * 390, "freq": "min"},
+}
+
+# strategy class, whether it trades many assets and the backtest setup
+STRATEGIES = {
+    "sma": (SmaStrategy, False, {"log_level": None}, {}),
+    "bollinger_bands": (BollingerBandStrategy, False, {"log_level": None},
+                        {"cheat_on_open": True}),
+    "rsi": (RsiSignalStrategy, False, {}, {}),
+    "mean_variance": (MeanVariancePortfStrategy, True,
+                      {"log_level": None, "n_periods": 63}, {}),
+}
+
+
+def generate_ohlcv(n_bars, n_assets=1, freq="B", random_seed=42):
+    """
+    Generates synthetic OHLCV data following a geometric Brownian motion.
+
+    Args:
+        n_bars (int): The number of bars
+        n_assets (int, optional): The number of assets. Defaults to 1.
+        freq (str, optional): The frequency of the bars, for example, "B"
+            for business days or "min" for minute bars (of the trading
+            hours). Defaults to "B".
+        random_seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        dict: Mapping of the tickers to their OHLCV data frames
+    """
+    rng = np.random.default_rng(random_seed)
+
+    if freq == "min":
+        days = pd.bdate_range("2000-01-03", periods=int(np.ceil(n_bars / 390)))
+        index = (days.repeat(390)
+                 + pd.to_timedelta(np.tile(np.arange(390), len(days)) + 570,
+                                   unit="min"))[:n_bars]
+        sigma = 0.02 / np.sqrt(390)
+    else:
+        index = pd.date_range("2000-01-03", periods=n_bars, freq=freq)
+        sigma = 0.02
+
+    log_returns = rng.normal(0, sigma, size=(n_bars, n_assets))
+    close = 100 * np.exp(np.cumsum(log_returns, axis=0))
+    open_ = close * np.exp(rng.normal(0, sigma / 2, size=close.shape))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, sigma / 2,
+                                                             close.shape)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, sigma / 2,
+                                                            close.shape)))
+    volume = rng.integers(1_000, 1_000_000, size=close.shape).astype(float)
+
+    return {
+        f"ASSET_{ind}": pd.DataFrame({"open": open_[:, ind],
+                                      "high": high[:, ind],
+                                      "low": low[:, ind],
+                                      "close": close[:, ind],
+                                      "volume": volume[:, ind]}, index=index)
+        for ind in range(n_assets)
+    }
+
+
+def _get_skip_reason(strategy_name):
+    """
+    Helper returning the reason why a strategy cannot be benchmarked in the
+    current environment, or None if it can.
+    """
+    if strategy_name == "rsi" and not HAS_TALIB:
+        return "TA-Lib is not installed (required by bt.talib.RSI)"
+    return None
+
+
+def _timed_strategy(strategy):
+    """
+    Helper creating a subclass of the strategy, which records the end of the
+    setup (`start`), the first bar of the event loop and its end (`stop`).
+    The indicators are calculated (in backtrader's default `runonce` mode)
+    between the first two.
+    """
+    def mark_first_bar(method_name):
+        parent_method = getattr(strategy, method_name)
+
+        def method(self, *args, **kwargs):
+            if self._phase_marks.get("first_bar") is None:
+                self._phase_marks["first_bar"] = time.perf_counter()
+            return parent_method(self, *args, **kwargs)
+
+        return method
+
+    def start(self):
+        self._phase_marks = {"start": time.perf_counter()}
+        strategy.start(self)
+
+    def stop(self):
+        strategy.stop(self)
+        self._phase_marks["stop"] = time.perf_counter()
+
+    namespace = {"start": start, "stop": stop}
+    for method_name in ["prenext", "nextstart", "next", "prenext_open",
+                        "nextstart_open", "next_open"]:
+        if hasattr(strategy, method_name):
+            namespace[method_name] = mark_first_bar(method_name)
+
+    return type(f"Timed{strategy.__name__}", (strategy,), namespace)
+
+
+def run_benchmark(strategy_name, frames, measure_memory=False):
+    """
+    Runs a single backtest of a strategy and measures its performance.
+
+    Args:
+        strategy_name (str): The name of the strategy from `STRATEGIES`
+        frames (dict): Mapping of the tickers to their OHLCV data frames
+        measure_memory (bool, optional): Whether to track the peak memory
+            usage with `tracemalloc`, which slows down the run (so the
+            timings are not reported). Defaults to False.
+
+    Returns:
+        dict: The wall time, the processed bars per second, the timings of
+            the phases (in seconds) and optionally the peak memory (in MB)
+    """
+    strategy, multi_asset, strategy_kwargs, cerebro_kwargs = \
+        STRATEGIES[strategy_name]
+    if not multi_asset:
+        frames = dict(list(frames.items())[:1])
+
+    if measure_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    cerebro = bt.Cerebro(stdstats=False, **cerebro_kwargs)
+    if multi_asset:
+        panel = PricePanel.from_frames(frames)
+        strategy_kwargs = {**strategy_kwargs, "panel": panel}
+        feeds = panel.to_feeds()
+        cerebro.broker.addcommissioninfo(FractionalTradesCommission())
+    else:
+        feeds = [bt.feeds.PandasData(dataname=df, name=ticker)
+                 for ticker, df in frames.items()]
+    for feed in feeds:
+        cerebro.adddata(feed)
+    timed_strategy = _timed_strategy(strategy)
+    cerebro.addstrategy(timed_strategy, **strategy_kwargs)
+    cerebro.broker.setcash(10000.0)
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name="sharpe_ratio")
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = cerebro.run()[0]
+        run_end = time.perf_counter()
+        result.analyzers.sharpe_ratio.get_analysis()
+        result.analyzers.drawdown.get_analysis()
+    end = time.perf_counter()
+
+    if measure_memory:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"peak_memory_mb": peak_memory / 2 ** 20}
+
+    marks = result._phase_marks
+    first_bar = marks.get("first_bar", marks["stop"])
+    n_bars = sum(len(df) for df in frames.values())
+    return {
+        "n_bars": n_bars,
+        "wall_time": end - start,
+        "bars_per_sec": n_bars / (end - start),
+        "setup_time": marks["start"] - start,
+        "indicators_time": first_bar - marks["start"],
+        "event_loop_time": marks["stop"] - first_bar,
+        "analyzers_time": (run_end - marks["stop"]) + (end - run_end),
+    }
+
+
+def _get_git_commit():
+    """
+    Helper returning the current git commit, if available.
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short",
+                                        "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(strategies=None, scenarios=None, n_assets_list=(1,),
+                   n_repeats=3, measure_memory=True, random_seed=42):
+    """
+    Runs the benchmarks of the strategies for all the combinations of the
+    scenarios and numbers of assets. The single-asset strategies are only
+    run once per scenario, on the first asset. The strategies with missing
+    dependencies (the RSI strategy without TA-Lib) are skipped with a
+    warning and their reason is recorded instead of the results.
+
+    Args:
+        strategies (list, optional): The names of the strategies. Defaults to
+            all of `STRATEGIES`.
+        scenarios (list, optional): The names of the scenarios. Defaults to
+            all of `SCENARIOS`.
+        n_assets_list (tuple, optional): The numbers of assets. Defaults to
+            (1,).
+        n_repeats (int, optional): The number of timed runs, of which the
+            fastest one is reported. Defaults to 3.
+        measure_memory (bool, optional): Whether to measure the peak memory
+            in an additional run. Defaults to True.
+        random_seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        dict: The report with the metadata of the environment and a list of
+            results, which can be saved as JSON
+    """
+    strategies = strategies or list(STRATEGIES)
+    scenarios = scenarios or list(SCENARIOS)
+    results = []
+
+    for scenario in scenarios:
+        for n_assets in n_assets_list:
+            frames = generate_ohlcv(n_assets=n_assets, random_seed=random_seed,
+                                    **SCENARIOS[scenario])
+            for strategy_name in strategies:
+                if not STRATEGIES[strategy_name][1] and n_assets != min(
+                        n_assets_list):
+                    continue
+
+                record = {"strategy": strategy_name, "scenario": scenario,
+                          "n_assets": n_assets if STRATEGIES[strategy_name][1]
+                          else 1}
+                skip_reason = _get_skip_reason(strategy_name)
+                if skip_reason is not None:
+                    warnings.warn(f"Skipping {strategy_name}: {skip_reason}")
+                    record["skipped"] = skip_reason
+                    results.append(record)
+                    continue
+                try:
+                    runs = [run_benchmark(strategy_name, frames)
+                            for _ in range(n_repeats)]
+                    record.update(min(runs, key=lambda run: run["wall_time"]))
+                    if measure_memory:
+                        record.update(run_benchmark(strategy_name, frames,
+                                                    measure_memory=True))
+                except Exception as e:
+                    record["error"] = f"{type(e).__name__}: {e}"
+                results.append(record)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _get_git_commit(),
+        "python_version": platform.python_version(),
+        "backtrader_version": bt.__version__,
+        "results": results,
+    }
+
+
+def compare_reports(old_report, new_report):
+    """
+    Compares two benchmark reports (for example, from different commits).
+
+    Args:
+        old_report (dict): The baseline report
+        new_report (dict): The new report
+
+    Returns:
+        pd.DataFrame: The wall times, the speedup (old/new wall time) and the
+            peak memory of both reports per benchmark
+    """
+    keys = ["strategy", "scenario", "n_assets"]
+    columns = keys + ["wall_time", "peak_memory_mb"]
+    old_df = pd.DataFrame(old_report["results"]).reindex(columns=columns)
+    new_df = pd.DataFrame(new_report["results"]).reindex(columns=columns)
+    comparison_df = old_df.merge(new_df, on=keys, suffixes=("_old", "_new"))
+    comparison_df["speedup"] = (comparison_df["wall_time_old"]
+                                / comparison_df["wall_time_new"])
+    return comparison_df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the backtests on synthetic data"
+    )
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES))
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--assets", nargs="+", type=int, default=[1, 10])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path) as f:
+                reports.append(json.load(f))
+        print(compare_reports(*reports).to_string())
+    else:
+        report = run_benchmarks(strategies=args.strategies,
+                                scenarios=args.scenarios,
+                                n_assets_list=args.assets,
+                                n_repeats=args.repeats,
+                                measure_memory=not args.no_memory)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(pd.DataFrame(report["results"]).to_string())
@@ -0,0 +1,178 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import backtrader as bt
+import pandas as pd
+
+# the cache can be pointed to a directory with test fixtures
+DEFAULT_CACHE_DIR = os.environ.get(
+    "YF_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "yf_cache")
+)
+
+
+def _get_cache_paths(ticker, auto_adjust, cache_dir):
+    """
+    Helper returning the paths of the Parquet file with the prices and of the
+    JSON file with the covered date range.
+    """
+    mode = "adjusted" if auto_adjust else "raw"
+    base_path = os.path.join(cache_dir, f"{ticker}_{mode}")
+    return f"{base_path}.parquet", f"{base_path}.json"
+
+
+def _download(ticker, start, end, auto_adjust):
+    """
+    Helper downloading the OHLCV data of a single ticker from Yahoo Finance.
+    """
+    import yfinance as yf
+
+    df = yf.download(ticker, start=start, end=end, progress=False,
+                     auto_adjust=auto_adjust)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df.index = pd.to_datetime(df.index).tz_localize(None)
+    df.index.name = "Date"
+    return df
+
+
+def _write_cache(df, covered_start, covered_end, data_path, range_path):
+    """
+    Helper writing the data and then the covered range to temporary files,
+    which replace the cached ones. Thanks to that, a reader (or a writer
+    interrupted midway) never leaves the range claiming data, which is not
+    in the Parquet file.
+    """
+    suffix = f".{os.getpid()}.tmp"
+    df.to_parquet(data_path + suffix)
+    os.replace(data_path + suffix, data_path)
+    with open(range_path + suffix, "w") as f:
+        json.dump({"start": str(covered_start), "end": str(covered_end)}, f)
+    os.replace(range_path + suffix, range_path)
+
+
+def _extend_covered_range(covered_range, range_start, range_end):
+    """
+    Helper extending the covered range (None if nothing is cached yet) by a
+    downloaded range, which is adjacent to it. The requested range is marked
+    as covered (so the non-trading days at its ends are not downloaded
+    again), but only up to today, as the last bar can still change.
+    """
+    range_end = min(range_end, pd.Timestamp.today().normalize())
+    if covered_range is None:
+        return range_start, range_end
+    covered_start, covered_end = covered_range
+    return min(covered_start, range_start), max(covered_end, range_end)
+
+
+def load_yahoo_data(ticker, start, end, auto_adjust=True, cache_dir=None,
+                    offline=False):
+    """
+    Loads the OHLCV data of a ticker, using a local Parquet cache keyed by
+    the ticker and the adjustment mode. Only the date ranges which are not
+    covered by the cache yet are downloaded, after which the cache is
+    updated. The covered range is tracked separately from the data, so
+    periods without trading (weekends, holidays) are not downloaded again.
+    It is only extended by the non-empty downloads (yfinance returns an
+    empty frame when the download fails) and up to today, so failed
+    downloads and the future dates are retried on the next call.
+
+    Args:
+        ticker (str): The ticker
+        start (str/datetime): The start date (inclusive)
+        end (str/datetime): The end date (exclusive), as in `yf.download`
+        auto_adjust (bool, optional): Whether to adjust the OHLC prices.
+            Defaults to True.
+        cache_dir (str, optional): The directory of the cache, for example,
+            with test fixtures. Defaults to `DEFAULT_CACHE_DIR`, which can be
+            set with the `YF_CACHE_DIR` environment variable.
+        offline (bool, optional): Whether to raise an error instead of
+            downloading the missing data. Defaults to False.
+
+    Returns:
+        pd.DataFrame: The OHLCV data
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    data_path, range_path = _get_cache_paths(ticker, auto_adjust, cache_dir)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+    if os.path.exists(data_path) and os.path.exists(range_path):
+        df = pd.read_parquet(data_path)
+        with open(range_path) as f:
+            covered = json.load(f)
+        covered_start = pd.Timestamp(covered["start"])
+        covered_end = pd.Timestamp(covered["end"])
+    else:
+        df = None
+        covered_start, covered_end = end, end
+
+    # ranges missing before and after the cached one
+    missing_ranges = []
+    if df is None:
+        missing_ranges.append((start, end))
+    else:
+        if start < covered_start:
+            missing_ranges.append((start, covered_start))
+        if end > covered_end:
+            missing_ranges.append((covered_end, end))
+
+    if missing_ranges:
+        if offline:
+            raise ValueError(f"Missing data for {ticker} in offline mode!")
+
+        covered_range = (None if df is None
+                         else (covered_start, covered_end))
+        downloaded = [_download(ticker, range_start, range_end, auto_adjust)
+                      for range_start, range_end in missing_ranges]
+        new_dfs = []
+        for (range_start, range_end), new_df in zip(missing_ranges,
+                                                    downloaded):
+            # failed downloads (empty frames) are not marked as covered
+            if new_df.empty:
+                continue
+            new_dfs.append(new_df)
+            covered_range = _extend_covered_range(covered_range, range_start,
+                                                  range_end)
+
+        if not new_dfs:
+            if df is None:
+                return downloaded[0]
+        else:
+            df = pd.concat([df] + new_dfs if df is not None else new_dfs)
+            df = df[~df.index.duplicated(keep="last")].sort_index()
+            os.makedirs(cache_dir, exist_ok=True)
+            _write_cache(df, *covered_range, data_path, range_path)
+
+    return df.loc[(df.index >= start) & (df.index < end)]
+
+
+class CachedYahooFinanceData(bt.feeds.PandasData):
+    """
+    Drop-in replacement of `bt.feeds.YahooFinanceData`, which reads the data
+    from the local cache of `load_yahoo_data`, downloading only the missing
+    parts. As in the original feed, `todate` is inclusive.
+
+    Example:
+        data = CachedYahooFinanceData(dataname="AAPL",
+                                      fromdate=datetime(2021, 1, 1),
+                                      todate=datetime(2021, 12, 31))
+    """
+    params = (
+        ("auto_adjust", True),
+        ("cache_dir", None),
+        ("offline", False),
+    )
+
+    def __init__(self):
+        ticker = self.p.dataname
+        self.p.dataname = load_yahoo_data(
+            ticker,
+            start=self.p.fromdate or datetime(1970, 1, 1),
+            end=(self.p.todate or datetime.now()) + timedelta(days=1),
+            auto_adjust=self.p.auto_adjust,
+            cache_dir=self.p.cache_dir,
+            offline=self.p.offline,
+        )
+        super().__init__()
+        self._name = self._name or ticker
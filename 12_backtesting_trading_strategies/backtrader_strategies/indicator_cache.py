@@ -0,0 +1,222 @@
+import array
+from collections import OrderedDict
+
+import backtrader as bt
+import numpy as np
+
+# maximum number of indicator stores kept in a process
+MAX_INDICATOR_STORES = 32
+
+# indicator stores of the data feeds (the least recently used first), see
+# `get_indicator_store`
+_INDICATOR_STORES = OrderedDict()
+
+# windows of the SMAs computed when a store is created, see
+# `set_prefill_periods`
+_PREFILL_PERIODS = []
+
+
+class IndicatorStore:
+    """
+    Store of precomputed indicators of a single series (for example, the
+    close prices of a data feed), keyed by the indicator's name and its
+    parameters.
+
+    The cumulative sums of the series and of its squares are computed once,
+    so any number of moving averages and standard deviations (for example,
+    for all the windows of a parameter sweep) costs a single vectorized
+    subtraction each. Values during the warm-up period are NaN.
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float64)
+        self._cumsum = np.concatenate(([0.0], np.cumsum(self.values)))
+        self._cumsum_sq = np.concatenate(([0.0], np.cumsum(self.values ** 2)))
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def _rolling_sum(self, cumsum, period):
+        rolling_sum = np.full(len(self), np.nan)
+        rolling_sum[period - 1:] = cumsum[period:] - cumsum[:-period]
+        return rolling_sum
+
+    def sma(self, period):
+        """
+        Simple Moving Average, equivalent to `bt.ind.SMA`.
+        """
+        key = ("sma", period)
+        if key not in self._cache:
+            self._cache[key] = self._rolling_sum(self._cumsum, period) / period
+        return self._cache[key]
+
+    def sma_many(self, periods):
+        """
+        Simple Moving Averages of all the `periods`, computed in a single
+        vectorized pass and stored for later use.
+
+        Args:
+            periods (iterable): The windows of the moving averages
+
+        Returns:
+            np.ndarray: Matrix (size: len(periods) x len(self)) of the SMAs
+        """
+        periods = np.asarray(list(periods))
+        ind = np.arange(len(self))
+        start = ind[None, :] + 1 - periods[:, None]
+        smas = ((self._cumsum[ind + 1][None, :]
+                 - self._cumsum[np.maximum(start, 0)])
+                / periods[:, None])
+        smas[start < 0] = np.nan
+
+        for period, values in zip(periods, smas):
+            self._cache[("sma", int(period))] = values
+        return smas
+
+    def stddev(self, period):
+        """
+        Population standard deviation over a rolling window, equivalent to
+        `bt.ind.StdDev`.
+        """
+        key = ("stddev", period)
+        if key not in self._cache:
+            mean = self.sma(period)
+            mean_sq = self._rolling_sum(self._cumsum_sq, period) / period
+            self._cache[key] = np.sqrt(np.maximum(mean_sq - mean ** 2, 0.0))
+        return self._cache[key]
+
+    def bollinger_bands(self, period, devfactor):
+        """
+        Bollinger Bands, equivalent to `bt.ind.BollingerBands`. The moving
+        average and the standard deviation are shared between different
+        values of `devfactor`.
+
+        Returns:
+            tuple: The middle, top and bottom bands
+        """
+        mid = self.sma(period)
+        dev = devfactor * self.stddev(period)
+        return mid, mid + dev, mid - dev
+
+
+def set_prefill_periods(periods):
+    """
+    Sets the windows of the SMAs computed (in a single vectorized pass, see
+    `IndicatorStore.sma_many`) whenever a new store is created, for example,
+    all the windows of the parameter grid of an optimization.
+
+    Args:
+        periods (iterable): The windows of the moving averages
+    """
+    _PREFILL_PERIODS[:] = sorted({int(period) for period in periods
+                                  if period > 0})
+
+
+def get_indicator_store(values, feed_key=""):
+    """
+    Returns the indicator store of a data feed, reusing the existing one if
+    the provided `values` are equal to (or a prefix of) its series. Thanks to
+    that, the store survives between the backtests of an optimization run
+    in the same process, also when they use shorter parts of the history.
+    Up to `MAX_INDICATOR_STORES` stores are kept, so the backtests of
+    different periods (for example, the folds of a walk-forward
+    optimization) do not replace each other's stores.
+
+    Args:
+        values (np.ndarray): The series, for example, the close prices
+        feed_key (hashable, optional): The key of the data feed. Defaults
+            to "".
+
+    Returns:
+        IndicatorStore: The store of the feed
+    """
+    values = np.asarray(values, dtype=np.float64)
+    store = _INDICATOR_STORES.get(feed_key)
+
+    if (store is None or len(store) < len(values)
+            or not np.array_equal(store.values[:len(values)], values)):
+        store = IndicatorStore(values)
+        periods = [period for period in _PREFILL_PERIODS
+                   if period <= len(store)]
+        if periods:
+            store.sma_many(periods)
+        _INDICATOR_STORES[feed_key] = store
+    _INDICATOR_STORES.move_to_end(feed_key)
+    while len(_INDICATOR_STORES) > MAX_INDICATOR_STORES:
+        _INDICATOR_STORES.popitem(last=False)
+
+    return store
+
+
+def _get_feed_store(data):
+    """
+    Helper returning the indicator store of the close prices of a preloaded
+    data feed. The store is keyed by the name of the feed and the datetime
+    of its first bar, as the feeds of the optimization runs are unnamed and
+    can start at different bars.
+    """
+    close = np.frombuffer(data.close.array, dtype=np.float64)
+    first_bar = data.datetime.array[0] if len(data.datetime.array) else None
+    return get_indicator_store(close, feed_key=(data._name, first_bar))
+
+
+def _copy_to_line(line, values, start, end):
+    """
+    Helper copying the precomputed values into the buffer of a line.
+    """
+    line.array[start:end] = array.array("d", values[start:end])
+
+
+class CachedSMA(bt.Indicator):
+    """
+    Simple Moving Average read from the indicator store of the data feed.
+    Requires preloaded data (the default in backtrader).
+    """
+    lines = ("sma",)
+    params = (("period", 20),)
+    alias = ("CachedSimpleMovingAverage",)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+        self._sma = None
+
+    def _get_sma(self):
+        if self._sma is None:
+            self._sma = _get_feed_store(self.data).sma(self.p.period)
+        return self._sma
+
+    def next(self):
+        self.lines.sma[0] = self._get_sma()[len(self) - 1]
+
+    def once(self, start, end):
+        _copy_to_line(self.lines.sma, self._get_sma(), start, end)
+
+
+class CachedBollingerBands(bt.Indicator):
+    """
+    Bollinger Bands read from the indicator store of the data feed.
+    Requires preloaded data (the default in backtrader).
+    """
+    lines = ("mid", "top", "bot",)
+    params = (("period", 20), ("devfactor", 2.0),)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+        self._bands = None
+
+    def _get_bands(self):
+        if self._bands is None:
+            self._bands = _get_feed_store(self.data).bollinger_bands(
+                self.p.period, self.p.devfactor
+            )
+        return self._bands
+
+    def next(self):
+        ind = len(self) - 1
+        for line, band in zip(self.lines, self._get_bands()):
+            line[0] = band[ind]
+
+    def once(self, start, end):
+        for line, band in zip(self.lines, self._get_bands()):
+            _copy_to_line(line, band, start, end)
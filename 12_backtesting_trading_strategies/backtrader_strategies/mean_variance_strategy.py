@@ -1,25 +1,44 @@
 # Backtesting a trading strategy based on the Simple Moving Average
  
-from datetime import datetime
+import logging
 import backtrader as bt
 from strategy_utils import *
+from panel_data import load_panel
+from rolling_estimators import RollingCovarianceEstimator
+from portfolio_optimizer import MinVolatilityOptimizer
+import numpy as np
 import pandas as pd
-from pypfopt.expected_returns import mean_historical_return
-from pypfopt.risk_models import CovarianceShrinkage
-from pypfopt.efficient_frontier import EfficientFrontier
 
 
 # Create a Strategy
 class MeanVariancePortfStrategy(bt.Strategy):
-    params = (("n_periods", 252), )
+    params = (("n_periods", 252),
+              ("panel", None),
+              ("log_level", logging.INFO),
+              ("log_path", None),)
 
     def __init__(self):  
         # track number of days
         self.day_counter = 0
+        # rolling covariance of the returns, updated with each bar
+        self.tickers = [data._name for data in self.datas]
+        self.cov_estimator = RollingCovarianceEstimator(
+            n_assets=len(self.datas), window=self.p.n_periods
+        )
+        # optimizer reused (and warm-started) across the rebalances
+        self.optimizer = MinVolatilityOptimizer(self.tickers)
+
+        # record the trade events, printing them depending on the log level
+        self.recorder = TradeEventRecorder(level=self.p.log_level)
                
-    def log(self, txt):
-        dt = self.datas[0].datetime.date(0).isoformat()
-        print(f"{dt}: {txt}")
+    def get_close_window(self, size):
+        """
+        Returns the last `size` close prices of all the assets (size x
+        n_assets), as a view of the panel if one was provided.
+        """
+        if self.p.panel is not None:
+            return self.p.panel.window(len(self) - 1, size, field="close")
+        return np.array([data.close.get(size=size) for data in self.datas]).T
 
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
@@ -30,21 +49,22 @@ class MeanVariancePortfStrategy(bt.Strategy):
         if order.status in [order.Completed]:
 
             direction = "b" if order.isbuy() else "s"
-            log_str = get_action_log_string(
+            self.recorder.record(
+                    self.datas[0].datetime[0],
+                    "executed",
+                    direction=direction, 
                     asset=order.data._name,
-                    dir=direction, 
-                    action="e", 
                     price=order.executed.price,
                     size=order.executed.size,
                     cost=order.executed.value, 
                     commission=order.executed.comm
                 )
-            self.log(log_str)
 
         # report failed order
         elif order.status in [order.Canceled, order.Margin, 
                               order.Rejected]:
-            self.log(f"Order Failed: {order.data._name}")
+            self.recorder.record(self.datas[0].datetime[0], "failed",
+                                 asset=order.data._name)
 
         # reset order -> no pending order
         self.order = None
@@ -53,77 +73,76 @@ class MeanVariancePortfStrategy(bt.Strategy):
         if not trade.isclosed:
             return
 
-        self.log(get_result_log_string(gross=trade.pnl, net=trade.pnlcomm))
+        self.recorder.record(self.datas[0].datetime[0], "result",
+                             gross=trade.pnl, net=trade.pnlcomm)
 
     def next(self):
 
+        # the bars with missing prices are skipped by the estimator
+        if len(self) > 1:
+            closes = self.get_close_window(2)
+            self.cov_estimator.update(closes[1] / closes[0] - 1)
+
         self.day_counter += 1
-        if self.day_counter < self.p.n_periods:
+        if (self.day_counter < self.p.n_periods
+                or not self.cov_estimator.is_ready):
             return
 
         today = self.datas[0].datetime.date()
         if today.weekday() != 4: 
             return
 
-        current_portf = {}
-        for data in self.datas:
-            current_portf[data._name] = self.positions[data].size * data.close[0]
-        portf_df = pd.DataFrame(current_portf, index=[0])
-        print(f"Current allocation as of {today}")
-        print(portf_df / portf_df.sum(axis=1).squeeze())
-
-        price_dict = {}
-        for data in self.datas:
-            price_dict[data._name] = data.close.get(0, self.p.n_periods+1)
-
-        prices_df = pd.DataFrame(price_dict)
-
-        mu = mean_historical_return(prices_df)
-        S = CovarianceShrinkage(prices_df).ledoit_wolf()
-
-        ef = EfficientFrontier(mu, S)
-        weights = ef.min_volatility()
-        print(f"Optimal allocation identified on {today}")
-        print(pd.DataFrame(ef.clean_weights(), index=[0]))
-
-        for allocation in list(ef.clean_weights().items()):
+        verbose = self.recorder.is_enabled(logging.INFO)
+        if verbose:
+            current_portf = {}
+            for data in self.datas:
+                current_portf[data._name] = self.positions[data].size * data.close[0]
+            portf_df = pd.DataFrame(current_portf, index=[0])
+            print(f"Current allocation as of {today}")
+            print(portf_df / portf_df.sum(axis=1).squeeze())
+
+        S = self.cov_estimator.ledoit_wolf()
+        self.optimizer.min_volatility(S)
+        if verbose:
+            print(f"Optimal allocation identified on {today} "
+                  f"(solved in {1000 * self.optimizer.solve_times[-1]:.2f} ms)")
+            print(pd.DataFrame(self.optimizer.clean_weights(), index=[0]))
+
+        for allocation in list(self.optimizer.clean_weights().items()):
             self.order_target_percent(data=allocation[0],
                                       target=allocation[1])
 
     def start(self):
-        print(f"Initial Portfolio Value: {self.broker.get_value():.2f}")
+        if self.recorder.is_enabled(logging.INFO):
+            print(f"Initial Portfolio Value: {self.broker.get_value():.2f}")
 
     def stop(self):
-        print(f"Final Portfolio Value: {self.broker.get_value():.2f}")
-
-# download data
-TICKERS = ["FB", "AMZN", "AAPL", "NFLX", "GOOG"]
-data_list = []
-
-for ticker in TICKERS:
-    data = bt.feeds.YahooFinanceData(
-        dataname=ticker,
-        fromdate=datetime(2020, 1, 1),
-        todate=datetime(2021, 12, 31)
-    )
-    data_list.append(data)
+        if self.recorder.is_enabled(logging.INFO):
+            print(f"Final Portfolio Value: {self.broker.get_value():.2f}")
+        if self.p.log_path is not None:
+            self.recorder.to_parquet(self.p.log_path)
 
 class FractionalTradesCommission(bt.CommissionInfo):
     def getsize(self, price, cash):
         """Returns the fractional size"""
         return self.p.leverage * (cash / price)
 
-cerebro = bt.Cerebro(stdstats = False)
+if __name__ == "__main__":
+    # download data into a single aligned panel
+    TICKERS = ["FB", "AMZN", "AAPL", "NFLX", "GOOG"]
+    panel = load_panel(TICKERS, start="2020-01-01", end="2022-01-01")
+
+    cerebro = bt.Cerebro(stdstats = False)
 
-cerebro.addstrategy(MeanVariancePortfStrategy)
+    cerebro.addstrategy(MeanVariancePortfStrategy, panel=panel)
 
-for ind, ticker in enumerate(TICKERS):
-    cerebro.adddata(data_list[ind], name=ticker)
+    for data in panel.to_feeds():
+        cerebro.adddata(data)
 
-cerebro.broker.setcash(10000.0)
-cerebro.broker.addcommissioninfo(FractionalTradesCommission(commission=0))
-cerebro.addobserver(MyBuySell)
-cerebro.addobserver(bt.observers.Value)
+    cerebro.broker.setcash(10000.0)
+    cerebro.broker.addcommissioninfo(FractionalTradesCommission(commission=0))
+    cerebro.addobserver(MyBuySell)
+    cerebro.addobserver(bt.observers.Value)
 
-# run backtest
-cerebro.run()
+    # run backtest
+    cerebro.run()
@@ -0,0 +1,137 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from data_cache import load_yahoo_data
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class PricePanel:
+    """
+    OHLCV data of many assets stored in a single NumPy array of shape
+    (n_dates, n_assets, n_fields), aligned to a shared calendar.
+
+    The fields and the lookback windows are returned as views of that array,
+    so cross-sectional computations (for example, the returns of all the
+    assets in a rebalance) do not copy the data or loop over the assets.
+
+    Example:
+        panel = load_panel(["AAPL", "MSFT"], "2021-01-01", "2022-01-01")
+        for data in panel.to_feeds():
+            cerebro.adddata(data)
+        # inside a strategy: the last 20 close prices of all the assets
+        closes = panel.window(len(self) - 1, 20, field="close")
+    """
+
+    def __init__(self, values, dates, tickers, fields=FIELDS):
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.fields = list(fields)
+
+    @classmethod
+    def from_frames(cls, frames, fields=FIELDS):
+        """
+        Creates the panel from separate data frames, aligned to the union of
+        their dates. Missing prices are forward-filled (the prices before the
+        first observation of an asset stay NaN), while missing volumes are
+        set to zero.
+
+        Args:
+            frames (dict): Mapping of the tickers to their OHLCV data frames
+            fields (tuple, optional): The fields of the panel, matched to the
+                columns case-insensitively. Defaults to `FIELDS`.
+
+        Returns:
+            PricePanel: The panel
+        """
+        dates = pd.DatetimeIndex(sorted(set().union(
+            *(df.index for df in frames.values())
+        )))
+        values = np.empty((len(dates), len(frames), len(fields)))
+
+        for ind, df in enumerate(frames.values()):
+            df = df.rename(columns=str.lower).reindex(dates)
+            for field_ind, field in enumerate(fields):
+                col = df[field]
+                values[:, ind, field_ind] = (col.fillna(0) if field == "volume"
+                                             else col.ffill())
+
+        return cls(values, dates, frames.keys(), fields)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def field(self, name):
+        """
+        Returns a view (size: n_dates x n_assets) of a single field.
+        """
+        return self.values[:, :, self.fields.index(name)]
+
+    def window(self, end, size, field=None):
+        """
+        Returns a view of the `size` bars ending with (and including) the bar
+        with index `end`.
+
+        Args:
+            end (int): The index of the last bar of the window
+            size (int): The number of bars in the window
+            field (str, optional): The field to return. Defaults to None,
+                which returns all the fields.
+
+        Returns:
+            np.ndarray: View of size (size x n_assets) for a single field or
+                (size x n_assets x n_fields) otherwise
+        """
+        if end - size + 1 < 0:
+            raise ValueError("Not enough bars for the window!")
+        values = self.values if field is None else self.field(field)
+        return values[end - size + 1:end + 1]
+
+    def to_frame(self, ticker):
+        """
+        Returns the OHLCV data of a single asset as a data frame.
+        """
+        ind = self.tickers.index(ticker)
+        return pd.DataFrame(self.values[:, ind, :], index=self.dates,
+                            columns=self.fields)
+
+    def to_feeds(self):
+        """
+        Returns the backtrader feeds of all the assets, named after their
+        tickers. As they share the calendar of the panel, the index of the
+        current bar in a strategy (`len(self) - 1`) is also the index of the
+        bar in the panel.
+        """
+        return [bt.feeds.PandasData(dataname=self.to_frame(ticker),
+                                    name=ticker)
+                for ticker in self.tickers]
+
+
+def load_panel(tickers, start, end, auto_adjust=True, cache_dir=None,
+               offline=False):
+    """
+    Loads the OHLCV data of many tickers (using the local cache of
+    `load_yahoo_data`) into a `PricePanel`.
+
+    Args:
+        tickers (list): The tickers
+        start (str/datetime): The start date (inclusive)
+        end (str/datetime): The end date (exclusive)
+        auto_adjust (bool, optional): Whether to adjust the OHLC prices.
+            Defaults to True.
+        cache_dir (str, optional): The directory of the cache. Defaults to
+            None.
+        offline (bool, optional): Whether to use only the cached data.
+            Defaults to False.
+
+    Returns:
+        PricePanel: The panel
+    """
+    frames = {
+        ticker: load_yahoo_data(ticker, start, end, auto_adjust=auto_adjust,
+                                cache_dir=cache_dir, offline=offline)
+        for ticker in tickers
+    }
+    return PricePanel.from_frames(frames)
@@ -0,0 +1,121 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class MinVolatilityOptimizer:
+    """
+    Persistent minimum volatility optimizer for repeated rebalances, solving
+    the same problem as `EfficientFrontier(mu, S).min_volatility()` with the
+    default long-only weight bounds:
+
+        min w^T S w  s.t.  sum(w) = 1, w >= 0
+
+    The problem is solved with a primal active-set method. The optimizer
+    keeps the weights of the previous rebalance and starts from them, so when
+    the covariance matrix changes only slightly between rebalances, the set
+    of assets with non-zero weights is mostly already correct and only a few
+    linear systems of the size of that set need to be solved. The solve time
+    of each rebalance is stored in `solve_times`.
+
+    Example:
+        optimizer = MinVolatilityOptimizer(tickers)
+        for S in covariance_matrices:
+            weights = optimizer.min_volatility(S)
+            print(optimizer.clean_weights(), optimizer.solve_times[-1])
+    """
+
+    def __init__(self, tickers, tol=1e-12, max_iter=None):
+        self.tickers = list(tickers)
+        self.tol = tol
+        self.max_iter = max_iter or 10 * len(self.tickers)
+        self.weights = None
+        self.solve_times = []
+        self.n_iters = []
+
+    @staticmethod
+    def _solve_equality_qp(S, free_set):
+        """
+        Helper returning the minimum variance weights of the assets in
+        `free_set`, subject only to the budget constraint.
+        """
+        S_free = S[np.ix_(free_set, free_set)]
+        x = np.linalg.solve(S_free, np.ones(len(free_set)))
+        return x / x.sum()
+
+    def min_volatility(self, S):
+        """
+        Finds the minimum volatility portfolio for the covariance matrix `S`,
+        warm-starting from the weights of the previous call.
+
+        Args:
+            S (np.ndarray/pd.DataFrame): The positive definite covariance
+                matrix, with the assets in the order of `tickers`
+
+        Returns:
+            np.ndarray: The optimal weights
+        """
+        start = time.perf_counter()
+        S = np.asarray(S, dtype=np.float64)
+
+        if self.weights is None:
+            # cold start with the asset of the lowest variance
+            w = np.zeros(len(S))
+            w[np.argmin(np.diag(S))] = 1.0
+        else:
+            w = self.weights.copy()
+        free = w > 0
+
+        for n_iter in range(1, self.max_iter + 1):
+            free_set = np.flatnonzero(free)
+            w_free = self._solve_equality_qp(S, free_set)
+
+            if np.all(w_free >= 0):
+                w = np.zeros(len(S))
+                w[free_set] = w_free
+                # KKT conditions: the marginal variance of the assets outside
+                # of the free set cannot be lower than of those inside it
+                grad = S @ w
+                multiplier = grad[free_set] @ w_free
+                violations = np.where(free, np.inf, grad - multiplier)
+                ind = np.argmin(violations)
+                if violations[ind] >= -self.tol * abs(multiplier):
+                    break
+                free[ind] = True
+            else:
+                # move towards the new weights until the first of them
+                # reaches zero and remove it from the free set
+                w_current = w[free_set]
+                decreasing = w_free < w_current
+                steps = (w_current[decreasing]
+                         / (w_current[decreasing] - w_free[decreasing]))
+                step = min(steps.min(), 1.0)
+                w[free_set] = w_current + step * (w_free - w_current)
+                blocking = free_set[decreasing][np.argmin(steps)]
+                w[blocking] = 0.0
+                w = np.maximum(w, 0.0)
+                free = w > 0
+        else:
+            raise ValueError("Optimization failed: maximum number of "
+                             "iterations reached")
+
+        self.weights = w
+        self.n_iters.append(n_iter)
+        self.solve_times.append(time.perf_counter() - start)
+        return self.weights
+
+    def clean_weights(self, cutoff=1e-4, rounding=5):
+        """
+        Sets the weights below `cutoff` to zero and rounds the rest, as
+        `EfficientFrontier.clean_weights`.
+
+        Returns:
+            OrderedDict: Mapping of the tickers to their weights
+        """
+        if self.weights is None:
+            raise AttributeError("Weights not yet computed")
+        weights = self.weights.copy()
+        weights[np.abs(weights) < cutoff] = 0
+        weights = np.round(weights, rounding)
+        return OrderedDict(zip(self.tickers, weights))
@@ -0,0 +1,162 @@
+import numpy as np
+
+
+class RollingCovarianceEstimator:
+    """
+    Rolling-window estimator of the mean and the covariance matrix of asset
+    returns, updated incrementally with each new bar.
+
+    The estimator keeps running sums over the window (of the returns, of
+    their cross products and of the scalar statistics needed by the
+    Ledoit-Wolf shrinkage). Adding a bar and removing the one leaving the
+    window costs O(n_assets^2), instead of recomputing the statistics from
+    the whole window. To avoid the accumulation of floating-point errors,
+    the sums are recomputed from the stored window every `recompute_every`
+    updates.
+
+    Example:
+        estimator = RollingCovarianceEstimator(n_assets=5, window=252)
+        for returns in returns_df.to_numpy():
+            estimator.update(returns)
+        S = estimator.ledoit_wolf()
+    """
+
+    def __init__(self, n_assets, window, recompute_every=None):
+        self.n_assets = n_assets
+        self.window = window
+        self.recompute_every = recompute_every or window
+        self.n_obs = 0
+        self.shrinkage = None
+        self._returns = np.zeros((window, n_assets))
+        self._pos = 0
+        self._n_updates = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        # sums of x, x^2, x x^T, ||x||^2 x and ||x||^4 over the window
+        self._sum = np.zeros(self.n_assets)
+        self._sum_sq = np.zeros(self.n_assets)
+        self._cross_prod = np.zeros((self.n_assets, self.n_assets))
+        self._norm_sq_weighted_sum = np.zeros(self.n_assets)
+        self._norm_fourth_sum = 0.0
+
+    def _add(self, x, sign):
+        norm_sq = x @ x
+        self._sum += sign * x
+        self._sum_sq += sign * x ** 2
+        self._cross_prod += sign * np.outer(x, x)
+        self._norm_sq_weighted_sum += sign * norm_sq * x
+        self._norm_fourth_sum += sign * norm_sq ** 2
+
+    def _recompute(self):
+        X = self._returns[:self.n_obs]
+        norm_sq = np.sum(X ** 2, axis=1)
+        self._sum = X.sum(axis=0)
+        self._sum_sq = np.sum(X ** 2, axis=0)
+        self._cross_prod = X.T @ X
+        self._norm_sq_weighted_sum = norm_sq @ X
+        self._norm_fourth_sum = np.sum(norm_sq ** 2)
+
+    @property
+    def is_ready(self):
+        """Whether the window is already filled with returns."""
+        return self.n_obs == self.window
+
+    def update(self, returns):
+        """
+        Adds the returns of a new bar, dropping the oldest bar once the
+        window is full. Bars with missing returns (for example, of assets
+        which are not listed yet or halted) are skipped, so the window only
+        contains complete observations.
+
+        Args:
+            returns (np.ndarray): Vector (size: n_assets) of the returns
+
+        Returns:
+            bool: Whether the bar was added
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        if not np.all(np.isfinite(returns)):
+            return False
+
+        if self.is_ready:
+            self._add(self._returns[self._pos], -1.0)
+        else:
+            self.n_obs += 1
+
+        self._returns[self._pos] = returns
+        self._add(returns, 1.0)
+        self._pos = (self._pos + 1) % self.window
+
+        self._n_updates += 1
+        if self._n_updates % self.recompute_every == 0:
+            self._recompute()
+        return True
+
+    def mean(self):
+        """
+        Returns the mean returns over the window.
+        """
+        return self._sum / self.n_obs
+
+    def _centered_cross_prod(self):
+        mean = self.mean()
+        return self._cross_prod - self.n_obs * np.outer(mean, mean)
+
+    def covariance(self, ddof=1):
+        """
+        Returns the sample covariance matrix of the returns over the window.
+
+        Args:
+            ddof (int, optional): Delta degrees of freedom. Defaults to 1.
+
+        Returns:
+            np.ndarray: The covariance matrix
+        """
+        return self._centered_cross_prod() / (self.n_obs - ddof)
+
+    def ledoit_wolf(self, frequency=252):
+        """
+        Returns the covariance matrix shrunk towards a scaled identity
+        matrix, following `sklearn.covariance.ledoit_wolf` (used by
+        `pypfopt.risk_models.CovarianceShrinkage.ledoit_wolf`). The
+        shrinkage constant is stored in the `shrinkage` attribute.
+
+        Args:
+            frequency (int, optional): The number of periods in a year used
+                for annualizing the covariance. Defaults to 252.
+
+        Returns:
+            np.ndarray: The annualized shrunk covariance matrix
+        """
+        n, p = self.n_obs, self.n_assets
+        mean = self.mean()
+        cross_prod = self._centered_cross_prod()
+        emp_cov = cross_prod / n
+
+        if p == 1:
+            self.shrinkage = 0.0
+            return emp_cov * frequency
+
+        # sum over the bars of ||x - mean||^4, expanded into the running sums
+        mean_norm_sq = mean @ mean
+        centered_fourth_sum = (
+            self._norm_fourth_sum
+            - 4 * self._norm_sq_weighted_sum @ mean
+            + 2 * mean_norm_sq * self._sum_sq.sum()
+            + 4 * mean @ self._cross_prod @ mean
+            - 3 * n * mean_norm_sq ** 2
+        )
+
+        trace = np.trace(emp_cov)
+        mu = trace / p
+        delta_ = np.sum(emp_cov ** 2)
+        beta = (centered_fourth_sum / n - delta_) / (p * n)
+        delta = (delta_ - 2.0 * mu * trace + p * mu ** 2) / p
+        beta = min(beta, delta)
+        self.shrinkage = 0.0 if beta == 0 else beta / delta
+
+        shrunk_cov = (1.0 - self.shrinkage) * emp_cov
+        shrunk_cov.flat[::p + 1] += self.shrinkage * mu
+
+        return shrunk_cov * frequency
@@ -3,6 +3,7 @@
 from datetime import datetime
 import backtrader as bt
 from strategy_utils import MyBuySell
+from data_cache import CachedYahooFinanceData
 
 # create a Strategy
 class RsiSignalStrategy(bt.SignalStrategy):
@@ -28,24 +29,25 @@ class RsiSignalStrategy(bt.SignalStrategy):
         self.signal_add(bt.SIGNAL_SHORT, rsi_signal_short)
         self.signal_add(bt.SIGNAL_SHORTEXIT, rsi < self.p.rsi_mid)
 
-# create a Data Feed
-data = bt.feeds.YahooFinanceData(dataname="FB",
-                                 fromdate=datetime(2021, 1, 1),
-                                 todate=datetime(2021, 12, 31))
+if __name__ == "__main__":
+    # create a Data Feed
+    data = CachedYahooFinanceData(dataname="FB",
+                                  fromdate=datetime(2021, 1, 1),
+                                  todate=datetime(2021, 12, 31))
 
-# create a Cerebro entity
-cerebro = bt.Cerebro(stdstats = False)
+    # create a Cerebro entity
+    cerebro = bt.Cerebro(stdstats = False)
 
-# # set up the backtest
-cerebro.addstrategy(RsiSignalStrategy)
-cerebro.adddata(data)
-cerebro.broker.setcash(1000.0)
-cerebro.broker.setcommission(commission=0.001)
-cerebro.addobserver(MyBuySell)
-cerebro.addobserver(bt.observers.Value)
+    # # set up the backtest
+    cerebro.addstrategy(RsiSignalStrategy)
+    cerebro.adddata(data)
+    cerebro.broker.setcash(1000.0)
+    cerebro.broker.setcommission(commission=0.001)
+    cerebro.addobserver(MyBuySell)
+    cerebro.addobserver(bt.observers.Value)
 
-print(f"Starting Portfolio Value: {cerebro.broker.getvalue():.2f}")
-cerebro.run()
-print(f"Final Portfolio Value: {cerebro.broker.getvalue():.2f}")
+    print(f"Starting Portfolio Value: {cerebro.broker.getvalue():.2f}")
+    cerebro.run()
+    print(f"Final Portfolio Value: {cerebro.broker.getvalue():.2f}")
 
-cerebro.plot(iplot=True, volume=False)
+    cerebro.plot(iplot=True, volume=False)
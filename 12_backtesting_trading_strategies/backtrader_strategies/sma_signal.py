@@ -3,13 +3,12 @@
 from datetime import datetime
 import backtrader as bt
 from strategy_utils import MyBuySell
-import yfinance as yf
+from data_cache import load_yahoo_data
 
-aapl_df = yf.download("AAPL", 
-                      start="2021-01-01", 
-                      end="2021-12-31",
-                      progress=False,
-                      auto_adjust=True)
+aapl_df = load_yahoo_data("AAPL",
+                          start="2021-01-01",
+                          end="2021-12-31",
+                          auto_adjust=True)
 
 aapl_df.head()
 
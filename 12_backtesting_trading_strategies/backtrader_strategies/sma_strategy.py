@@ -1,12 +1,16 @@
 # Backtesting a trading strategy based on the Simple Moving Average
  
+import logging
 from datetime import datetime
 import backtrader as bt
 from strategy_utils import *
+from data_cache import CachedYahooFinanceData
 
 # Create a Strategy
 class SmaStrategy(bt.Strategy):
-    params = (("ma_period", 20), )
+    params = (("ma_period", 20),
+              ("log_level", logging.INFO),
+              ("log_path", None),)
 
     def __init__(self):
         # keep track of close price in the series
@@ -18,10 +22,9 @@ class SmaStrategy(bt.Strategy):
         # add a simple moving average indicator
         self.sma = bt.ind.SMA(self.datas[0],
                               period=self.params.ma_period)
-        
-    def log(self, txt):
-        dt = self.datas[0].datetime.date(0).isoformat()
-        print(f"{dt}: {txt}")
+
+        # record the trade events, printing them depending on the log level
+        self.recorder = TradeEventRecorder(level=self.p.log_level)
 
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
@@ -32,20 +35,20 @@ class SmaStrategy(bt.Strategy):
         if order.status in [order.Completed]:
 
             direction = "b" if order.isbuy() else "s"
-            log_str = get_action_log_string(
-                    dir=direction, 
-                    action="e", 
+            self.recorder.record(
+                    self.datas[0].datetime[0],
+                    "executed",
+                    direction=direction, 
                     price=order.executed.price,
                     size=order.executed.size,
                     cost=order.executed.value, 
                     commission=order.executed.comm
                 )
-            self.log(log_str)
 
         # report failed order
         elif order.status in [order.Canceled, order.Margin, 
                               order.Rejected]:
-            self.log("Order Failed")
+            self.recorder.record(self.datas[0].datetime[0], "failed")
 
         # reset order -> no pending order
         self.order = None
@@ -54,7 +57,8 @@ class SmaStrategy(bt.Strategy):
         if not trade.isclosed:
             return
 
-        self.log(get_result_log_string(gross=trade.pnl, net=trade.pnlcomm))
+        self.recorder.record(self.datas[0].datetime[0], "result",
+                             gross=trade.pnl, net=trade.pnlcomm)
 
     def next(self):
         # do nothing if an order is pending
@@ -65,37 +69,46 @@ class SmaStrategy(bt.Strategy):
         if not self.position:
             # buy condition
             if self.data_close[0] > self.sma[0]:
-                self.log(get_action_log_string("b", "c", self.data_close[0], 1))
+                self.recorder.record(self.datas[0].datetime[0], "created",
+                                     direction="b", price=self.data_close[0],
+                                     size=1)
                 self.order = self.buy()
         else:
             # sell condition
             if self.data_close[0] < self.sma[0]:      
-                self.log(get_action_log_string("s", "c", self.data_close[0], 1))      
+                self.recorder.record(self.datas[0].datetime[0], "created",
+                                     direction="s", price=self.data_close[0],
+                                     size=1)
                 self.order = self.sell()
 
     def start(self):
-        print(f"Initial Portfolio Value: {self.broker.get_value():.2f}")
+        if self.recorder.is_enabled(logging.INFO):
+            print(f"Initial Portfolio Value: {self.broker.get_value():.2f}")
 
     def stop(self):
-        print(f"Final Portfolio Value: {self.broker.get_value():.2f}")
-
-# download data
-data = bt.feeds.YahooFinanceData(dataname="AAPL",
-                                 fromdate=datetime(2021, 1, 1),
-                                 todate=datetime(2021, 12, 31))
-
-# create a Cerebro entity
-cerebro = bt.Cerebro(stdstats = False)
-
-# set up the backtest
-cerebro.adddata(data)
-cerebro.broker.setcash(1000.0)
-cerebro.addstrategy(SmaStrategy)
-cerebro.addobserver(MyBuySell)
-cerebro.addobserver(bt.observers.Value)
-
-# run backtest
-cerebro.run()
-
-# plot results
-cerebro.plot(iplot=True, volume=False)
+        if self.recorder.is_enabled(logging.INFO):
+            print(f"Final Portfolio Value: {self.broker.get_value():.2f}")
+        if self.p.log_path is not None:
+            self.recorder.to_parquet(self.p.log_path)
+
+if __name__ == "__main__":
+    # download data
+    data = CachedYahooFinanceData(dataname="AAPL",
+                                  fromdate=datetime(2021, 1, 1),
+                                  todate=datetime(2021, 12, 31))
+
+    # create a Cerebro entity
+    cerebro = bt.Cerebro(stdstats = False)
+
+    # set up the backtest
+    cerebro.adddata(data)
+    cerebro.broker.setcash(1000.0)
+    cerebro.addstrategy(SmaStrategy)
+    cerebro.addobserver(MyBuySell)
+    cerebro.addobserver(bt.observers.Value)
+
+    # run backtest
+    cerebro.run()
+
+    # plot results
+    cerebro.plot(iplot=True, volume=False)
@@ -1,7 +1,9 @@
 # Optimizing the parameters of a trading strategy based on the Simple Moving Average
  
-from datetime import datetime
 import backtrader as bt
+from strategy_optimization import optimize_strategy, walk_forward_optimization
+from indicator_cache import CachedSMA
+from data_cache import load_yahoo_data
 
 # Create a Strategy
 class SmaStrategy(bt.Strategy):
@@ -14,12 +16,9 @@ class SmaStrategy(bt.Strategy):
         # keep track of pending orders
         self.order = None
 
-        # add a simple moving average indicator
-        self.sma = bt.ind.SMA(self.datas[0], period=self.params.ma_period)
-
-    def log(self, txt):
-        dt = self.datas[0].datetime.date(0).isoformat()
-        print(f"{dt}: {txt}")
+        # add a simple moving average indicator, read from the store shared 
+        # by all the runs of the optimization
+        self.sma = CachedSMA(self.datas[0], period=self.params.ma_period)
 
     def notify_order(self, order):
         # skipping the logging
@@ -41,19 +40,24 @@ class SmaStrategy(bt.Strategy):
             if self.data_close[0] < self.sma[0]:
                 self.order = self.sell()
 
-    def stop(self):
-        self.log(f"(ma_period = {self.params.ma_period:2d}) --- Terminal Value: {self.broker.getvalue():.2f}")
-
-# download data
-data = bt.feeds.YahooFinanceData(dataname="AAPL",
-                                 fromdate=datetime(2021, 1, 1),
-                                 todate=datetime(2021, 12, 31))
-
-# create a Cerebro entity
-cerebro = bt.Cerebro(stdstats = False)
-
-# set up the backtest
-cerebro.adddata(data)
-cerebro.optstrategy(SmaStrategy, ma_period=range(10, 31))
-cerebro.broker.setcash(1000.0)
-cerebro.run(maxcpus=1)
+# run the optimization in parallel
+if __name__ == "__main__":
+    # download data
+    aapl_df = load_yahoo_data("AAPL",
+                              start="2021-01-01",
+                              end="2021-12-31",
+                              auto_adjust=True)
+
+    results_df = optimize_strategy(SmaStrategy, aapl_df,
+                                   param_grid={"ma_period": range(10, 31)},
+                                   cash=1000.0)
+    print(results_df)
+
+    # walk-forward optimization: optimize on 6 months, trade the next 2
+    folds_df, equity_curve = walk_forward_optimization(
+        SmaStrategy, aapl_df,
+        param_grid={"ma_period": range(10, 31)},
+        train_size=126, test_size=42, warmup=30, cash=1000.0
+    )
+    print(folds_df)
+    print(equity_curve.tail())
@@ -0,0 +1,477 @@
+import contextlib
+import io
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from indicator_cache import set_prefill_periods
+
+# data feed of the worker process, attached once in `_init_worker`
+_WORKER_DATA = {}
+
+
+def _init_worker(shm_name, shape, index, columns, indicator_periods=()):
+    """
+    Initializer of the worker processes. Attaches to the shared memory block
+    with the OHLCV data and wraps it in a DataFrame, which is then reused by
+    all the runs executed by the worker. The indicator stores created by the
+    worker are pre-filled with the SMAs of `indicator_periods`.
+    """
+    set_prefill_periods(indicator_periods)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _WORKER_DATA["shm"] = shm
+    _WORKER_DATA["df"] = pd.DataFrame(values, index=index, columns=columns,
+                                      copy=False)
+
+
+@contextlib.contextmanager
+def _shared_data_executor(df, n_workers=None, indicator_periods=()):
+    """
+    Context manager placing the OHLCV data in shared memory and starting a
+    pool of processes, each of which attaches to it once.
+    """
+    values = df.to_numpy(dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+
+        executor = ProcessPoolExecutor(
+            max_workers=n_workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(shm.name, values.shape, df.index, df.columns,
+                      indicator_periods),
+        )
+        with executor:
+            yield executor
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _gated_strategy(strategy, trade_start):
+    """
+    Helper creating a subclass of the strategy, which ignores the orders
+    placed before `trade_start`. All the orders (also `close` and
+    `order_target_*`) go through `buy` and `sell`, so the strategy can
+    compute its indicators on the preceding bars, but not trade on them.
+    """
+    trade_start = pd.Timestamp(trade_start).to_pydatetime()
+
+    def is_gated(self):
+        return self.datas[0].datetime.datetime(0) < trade_start
+
+    def buy(self, *args, **kwargs):
+        return None if is_gated(self) else strategy.buy(self, *args, **kwargs)
+
+    def sell(self, *args, **kwargs):
+        return (None if is_gated(self)
+                else strategy.sell(self, *args, **kwargs))
+
+    return type(f"Gated{strategy.__name__}", (strategy,),
+                {"buy": buy, "sell": sell})
+
+
+def _get_sharpe_ratio(returns, riskfreerate=0.01):
+    """
+    Helper calculating the Sharpe ratio of the per-bar returns as
+    `bt.analyzers.SharpeRatio` with its default parameters, that is, from
+    the yearly returns in excess of `riskfreerate`. Returns None for less
+    than two years, as the analyzer.
+    """
+    yearly_returns = (1 + returns).groupby(returns.index.year).prod() - 1
+    excess_returns = yearly_returns - riskfreerate
+    std = excess_returns.std(ddof=0)
+    if len(excess_returns) == 0 or not std > 0:
+        return None
+    return excess_returns.mean() / std
+
+
+def _get_max_drawdown(returns):
+    """
+    Helper calculating the maximum drawdown (in %) of the per-bar returns,
+    as `bt.analyzers.DrawDown`.
+    """
+    equity = np.concatenate(([1.0], np.cumprod(1 + returns.to_numpy())))
+    peak = np.maximum.accumulate(equity)
+    return 100 * np.max((peak - equity) / peak)
+
+
+def run_backtest(strategy, df, params, cash=10000.0, commission=0.0,
+                 cerebro_kwargs=None, return_equity=False, trade_start=None):
+    """
+    Runs a single backtest and collects its summary instead of printing it.
+    Anything the strategy prints is discarded.
+
+    Args:
+        strategy (bt.Strategy): The strategy class
+        df (pd.DataFrame): OHLCV data
+        params (dict): The parameters of the strategy
+        cash (float, optional): The starting cash. Defaults to 10000.0.
+        commission (float, optional): The commission rate. Defaults to 0.0.
+        cerebro_kwargs (dict, optional): Additional arguments of `bt.Cerebro`,
+            for example, `cheat_on_open`. Defaults to None.
+        return_equity (bool, optional): Whether to also return the per-bar
+            returns of the portfolio (under the "returns" key). Defaults to
+            False.
+        trade_start (datetime, optional): The first bar on which the
+            strategy can place orders, the preceding bars are only used to
+            warm up its indicators. Defaults to None, which allows trading
+            on all the bars.
+
+    Returns:
+        dict: The parameters together with the terminal value, the Sharpe
+            ratio and the maximum drawdown (in %)
+    """
+    if trade_start is not None:
+        strategy = _gated_strategy(strategy, trade_start)
+
+    cerebro = bt.Cerebro(stdstats=False, optreturn=True,
+                         **(cerebro_kwargs or {}))
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(strategy, **params)
+    cerebro.broker.setcash(cash)
+    cerebro.broker.setcommission(commission=commission)
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name="sharpe_ratio")
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
+    if return_equity:
+        cerebro.addanalyzer(bt.analyzers.TimeReturn, _name="time_return")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = cerebro.run()[0]
+
+    summary = {
+        **params,
+        "terminal_value": cerebro.broker.getvalue(),
+        "sharpe_ratio": result.analyzers.sharpe_ratio.get_analysis()["sharperatio"],
+        "max_drawdown": result.analyzers.drawdown.get_analysis().max.drawdown,
+    }
+    if return_equity:
+        summary["returns"] = pd.Series(
+            result.analyzers.time_return.get_analysis()
+        )
+    return summary
+
+
+def _run_in_worker(strategy, params, start, end, cash, commission,
+                   cerebro_kwargs, return_equity=False, trade_start=None):
+    """
+    Runs a single backtest on the bars from `start` to `end` (exclusive) of
+    the worker's data, trading only from the bar `trade_start` (if given).
+    """
+    df = _WORKER_DATA["df"].iloc[start:end]
+    if trade_start is not None:
+        trade_start = _WORKER_DATA["df"].index[trade_start]
+    return run_backtest(strategy, df, params, cash=cash,
+                        commission=commission, cerebro_kwargs=cerebro_kwargs,
+                        return_equity=return_equity, trade_start=trade_start)
+
+
+def get_param_combinations(param_grid):
+    """
+    Creates all the combinations of the parameters from a grid.
+
+    Args:
+        param_grid (dict): Mapping of the parameter names to the lists of
+            their values
+
+    Returns:
+        list: List of dictionaries with the parameter combinations
+    """
+    names = list(param_grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*param_grid.values())]
+
+
+def is_indicator_period(name):
+    """
+    Returns whether a parameter is the window of an indicator, following the
+    naming convention of the strategies: "period", "*_period(s)" (for
+    example, "rsi_periods") and "ma_*" (for example, "ma_period").
+    """
+    return (name in ("period", "periods") or name.endswith("_period")
+            or name.endswith("_periods") or name.startswith("ma_"))
+
+
+def _get_indicator_periods(param_grid, indicator_params=None):
+    """
+    Helper returning the positive integer values of the indicator windows in
+    the parameter grid, that is, of the parameters in `indicator_params` or
+    (if not given) of the ones named as in `is_indicator_period`.
+    """
+    if indicator_params is None:
+        indicator_params = [name for name in param_grid
+                            if is_indicator_period(name)]
+    return sorted({int(value) for name in indicator_params
+                   for value in param_grid[name]
+                   if isinstance(value, (int, np.integer))
+                   and not isinstance(value, bool) and value > 0})
+
+
+def optimize_strategy(strategy, df, param_grid, search="grid", n_iter=10,
+                      metric="terminal_value", eta=3, min_bars=None,
+                      indicator_params=None, cash=10000.0, commission=0.0,
+                      n_workers=None, random_seed=42, cerebro_kwargs=None,
+                      strategy_kwargs=None):
+    """
+    Optimizes the parameters of a strategy, running the backtests in parallel
+    on a pool of processes. The data is placed in shared memory and each
+    worker wraps it into a data frame only once.
+
+    Available search methods:
+    * "grid" - all the combinations from `param_grid`,
+    * "random" - `n_iter` combinations sampled from `param_grid`,
+    * "halving" - successive halving, which evaluates all the combinations
+      on a short (initial) part of the history, keeps the best `1/eta` of
+      them and repeats with `eta` times more bars, until the full history.
+      Each round uses at least `min_bars` bars, so the candidates with long
+      indicator windows can trade in the first rounds.
+
+    Ties in `metric` (for example, of the candidates that did not trade) are
+    broken by the order of the combinations in `param_grid`, so the ranking
+    and the pruning are deterministic.
+
+    Args:
+        strategy (bt.Strategy): The strategy class. It must be importable by
+            the worker processes, so define it at the top level of a module
+            and run the script under `if __name__ == "__main__":`.
+        df (pd.DataFrame): OHLCV data with a DatetimeIndex
+        param_grid (dict): Mapping of the parameter names to the lists of
+            their values, for example, {"period": range(10, 31),
+            "devfactor": [1.5, 2.0, 2.5]}
+        search (str, optional): The search method, one of ["grid", "random",
+            "halving"]. Defaults to "grid".
+        n_iter (int, optional): The number of sampled combinations for the
+            random search. Defaults to 10.
+        metric (str, optional): The metric to maximize, one of
+            ["terminal_value", "sharpe_ratio"]. Defaults to "terminal_value".
+        eta (int, optional): The reduction factor of successive halving.
+            Defaults to 3.
+        min_bars (int, optional): The minimum number of bars of a successive
+            halving round. Defaults to twice the longest indicator window in
+            `param_grid` (the warm-up and the same number of bars to trade
+            on).
+        indicator_params (list, optional): The names of the parameters with
+            the indicator windows, used for `min_bars` and for pre-filling
+            the indicator stores (see `indicator_cache`). Defaults to None,
+            which selects them by name with `is_indicator_period`.
+        cash (float, optional): The starting cash. Defaults to 10000.0.
+        commission (float, optional): The commission rate. Defaults to 0.0.
+        n_workers (int, optional): The number of processes. Defaults to the
+            number of CPUs.
+        random_seed (int, optional): Seed of the random search. Defaults
+            to 42.
+        cerebro_kwargs (dict, optional): Additional arguments of `bt.Cerebro`.
+            Defaults to None.
+        strategy_kwargs (dict, optional): Fixed parameters of the strategy
+            used in all the runs, for example, `use_indicator_cache`.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: One row per run with the parameters and the metrics,
+            sorted by `metric`. For successive halving, the round and the
+            number of bars used are reported as well and the runs are sorted
+            within each round.
+    """
+    candidates = get_param_combinations(param_grid)
+    indicator_periods = _get_indicator_periods(param_grid, indicator_params)
+    n_rounds = 0
+
+    if search == "random":
+        rng = np.random.default_rng(random_seed)
+        n_iter = min(n_iter, len(candidates))
+        candidates = [candidates[ind] for ind in
+                      rng.choice(len(candidates), size=n_iter, replace=False)]
+    elif search == "halving":
+        n_rounds = int(np.ceil(np.log(len(candidates)) / np.log(eta)))
+        if min_bars is None:
+            min_bars = 2 * max(indicator_periods, default=0)
+    elif search != "grid":
+        raise ValueError("Wrong input for search!")
+
+    with _shared_data_executor(
+        df, n_workers, indicator_periods=indicator_periods
+    ) as executor:
+        results = []
+        for round_ind in range(n_rounds + 1):
+            n_bars = min(max(int(len(df) * eta ** (round_ind - n_rounds)),
+                             min_bars or 0), len(df))
+            futures = [
+                executor.submit(_run_in_worker, strategy,
+                                {**(strategy_kwargs or {}), **params},
+                                0, n_bars, cash, commission, cerebro_kwargs)
+                for params in candidates
+            ]
+            round_df = (pd.DataFrame([future.result() for future in futures])
+                        .drop(columns=list(strategy_kwargs or {})))
+            # the stable sort keeps the order of `candidates` for the ties
+            round_df = round_df.sort_values(metric, ascending=False,
+                                            na_position="last", kind="stable")
+
+            if search == "halving":
+                round_df["round"] = round_ind
+                round_df["n_bars"] = n_bars
+                n_keep = int(np.ceil(len(candidates) / eta))
+                candidates = (round_df[list(param_grid)].head(n_keep)
+                              .to_dict("records"))
+            results.append(round_df)
+
+    return pd.concat(results, ignore_index=True)
+
+
+def get_walk_forward_folds(n_bars, train_size, test_size, step=None,
+                           anchored=False):
+    """
+    Splits the bars into consecutive in-sample/out-of-sample folds.
+
+    Args:
+        n_bars (int): The number of bars
+        train_size (int): The number of in-sample bars (of the first fold, if
+            `anchored`)
+        test_size (int): The number of out-of-sample bars
+        step (int, optional): The shift between the folds. Defaults to
+            `test_size`, so the out-of-sample periods do not overlap.
+        anchored (bool, optional): Whether all the in-sample periods start
+            with the first bar (expanding window). Defaults to False.
+
+    Returns:
+        list: Tuples of (train_start, train_end, test_start, test_end)
+            positions, with the ends being exclusive
+    """
+    step = step or test_size
+    folds = []
+    train_end = train_size
+    while train_end < n_bars:
+        train_start = 0 if anchored else train_end - train_size
+        test_end = min(train_end + test_size, n_bars)
+        folds.append((train_start, train_end, train_end, test_end))
+        train_end += step
+    return folds
+
+
+def walk_forward_optimization(strategy, df, param_grid, train_size,
+                              test_size, step=None, anchored=False,
+                              warmup=0, metric="terminal_value",
+                              indicator_params=None, cash=10000.0,
+                              commission=0.0, n_workers=None,
+                              cerebro_kwargs=None, strategy_kwargs=None):
+    """
+    Runs a walk-forward optimization: for each fold, the parameters are
+    optimized (grid search) on the in-sample period and the best ones are
+    evaluated on the following out-of-sample period.
+
+    All the in-sample runs of all the folds are executed in parallel on a
+    single pool of processes sharing the data (see `optimize_strategy`),
+    followed by the out-of-sample runs. The out-of-sample returns of the
+    folds are then chained into a single equity curve.
+
+    Args:
+        strategy (bt.Strategy): The strategy class, defined at the top level
+            of a module
+        df (pd.DataFrame): OHLCV data with a DatetimeIndex
+        param_grid (dict): Mapping of the parameter names to the lists of
+            their values
+        train_size (int): The number of in-sample bars
+        test_size (int): The number of out-of-sample bars
+        step (int, optional): The shift between the folds. Defaults to
+            `test_size`. With a smaller step, the out-of-sample periods
+            overlap and each bar enters the equity curve only once, from the
+            earliest fold containing it.
+        anchored (bool, optional): Whether to use expanding in-sample
+            windows. Defaults to False.
+        warmup (int, optional): The number of bars preceding each
+            out-of-sample period added to its backtest, so the indicators are
+            already available at its start. The strategy cannot place orders
+            on these bars and both the out-of-sample metrics and the equity
+            curve only cover the out-of-sample bars. Defaults to 0.
+        metric (str, optional): The metric to maximize, one of
+            ["terminal_value", "sharpe_ratio"]. Defaults to "terminal_value".
+        indicator_params (list, optional): The names of the parameters with
+            the indicator windows, see `optimize_strategy`. Defaults to None.
+        cash (float, optional): The starting cash. Defaults to 10000.0.
+        commission (float, optional): The commission rate. Defaults to 0.0.
+        n_workers (int, optional): The number of processes. Defaults to the
+            number of CPUs.
+        cerebro_kwargs (dict, optional): Additional arguments of `bt.Cerebro`.
+            Defaults to None.
+        strategy_kwargs (dict, optional): Fixed parameters of the strategy
+            used in all the runs. Defaults to None.
+
+    Returns:
+        tuple: A data frame with one row per fold (the periods, the best
+            parameters, their in-sample metric and the out-of-sample
+            metrics) and a series with the stitched out-of-sample equity curve
+    """
+    folds = get_walk_forward_folds(len(df), train_size, test_size, step=step,
+                                   anchored=anchored)
+    candidates = get_param_combinations(param_grid)
+    strategy_kwargs = strategy_kwargs or {}
+
+    with _shared_data_executor(
+        df, n_workers,
+        indicator_periods=_get_indicator_periods(param_grid, indicator_params)
+    ) as executor:
+        in_sample_futures = [
+            [executor.submit(_run_in_worker, strategy,
+                             {**strategy_kwargs, **params}, train_start,
+                             train_end, cash, commission, cerebro_kwargs)
+             for params in candidates]
+            for train_start, train_end, _, _ in folds
+        ]
+        best_params, best_metrics = [], []
+        for futures in in_sample_futures:
+            fold_df = pd.DataFrame([future.result() for future in futures])
+            best_ind = fold_df.sort_values(metric, ascending=False,
+                                           na_position="last",
+                                           kind="stable").index[0]
+            best_params.append(candidates[best_ind])
+            best_metrics.append(fold_df.at[best_ind, metric])
+
+        out_of_sample_futures = [
+            executor.submit(_run_in_worker, strategy,
+                            {**strategy_kwargs, **params},
+                            max(test_start - warmup, 0), test_end, cash,
+                            commission, cerebro_kwargs, True, test_start)
+            for params, (_, _, test_start, test_end) in zip(best_params, folds)
+        ]
+        out_of_sample_runs = [future.result()
+                              for future in out_of_sample_futures]
+
+    fold_results = []
+    returns = []
+    last_date = None
+    for ind, (fold, params, in_sample_metric, oos_run) in enumerate(
+            zip(folds, best_params, best_metrics, out_of_sample_runs)):
+        train_start, train_end, test_start, test_end = fold
+        # the metrics only cover the out-of-sample bars, not the warm-up
+        fold_returns = oos_run["returns"]
+        fold_returns = fold_returns[fold_returns.index
+                                    >= df.index[test_start]]
+        fold_results.append({
+            "fold": ind,
+            "train_start": df.index[train_start],
+            "train_end": df.index[train_end - 1],
+            "test_start": df.index[test_start],
+            "test_end": df.index[test_end - 1],
+            **params,
+            f"in_sample_{metric}": in_sample_metric,
+            "out_of_sample_terminal_value": cash * (1 + fold_returns).prod(),
+            "out_of_sample_sharpe_ratio": _get_sharpe_ratio(fold_returns),
+            "out_of_sample_max_drawdown": _get_max_drawdown(fold_returns),
+        })
+        # with overlapping folds (`step` < `test_size`), the bars already in
+        # the equity curve are taken from the previous fold
+        if last_date is not None:
+            fold_returns = fold_returns[fold_returns.index > last_date]
+        last_date = df.index[test_end - 1]
+        returns.append(fold_returns)
+
+    equity_curve = cash * (1 + pd.concat(returns)).cumprod()
+    equity_curve.name = "equity"
+
+    return pd.DataFrame(fold_results), equity_curve
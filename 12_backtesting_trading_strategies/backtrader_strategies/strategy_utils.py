@@ -1,4 +1,8 @@
+import logging
+
 import backtrader as bt
+import numpy as np
+import pandas as pd
 
 class MyBuySell(bt.observers.BuySell):
     """
@@ -79,3 +83,126 @@ def get_result_log_string(gross, net):
     """
     str = f"OPERATION RESULT - Gross: {gross:.2f}, Net: {net:.2f}"
     return str
+
+class TradeEventRecorder:
+    """
+    Structured recorder of the trade events of a strategy (created/executed/
+    failed orders and closed trades), replacing printing the logs directly.
+
+    The events are appended to preallocated columnar buffers, which grow when
+    full. The log strings are only formatted (and printed) for the events
+    with a level at least as high as the recorder's `level`, so with the logs
+    turned off (`level=None`) recording an event costs a few array writes.
+    The recorded events can be retrieved with `to_frame` or saved with
+    `to_parquet`.
+
+    Example:
+        self.recorder = TradeEventRecorder(level=logging.INFO)
+        self.recorder.record(self.datas[0].datetime[0], "created",
+                             direction="b", price=self.data_close[0], size=1)
+    """
+    EVENTS = ("created", "executed", "failed", "result")
+    EVENT_LEVELS = (logging.INFO, logging.INFO, logging.WARNING, logging.INFO)
+    DIRECTIONS = ("", "b", "s")
+    FIELDS = ("price", "size", "cost", "commission", "cash", "open", "close",
+              "gross", "net")
+
+    def __init__(self, level=logging.INFO, capacity=1024):
+        self.level = level
+        self.n_events = 0
+        self._datetime = np.empty(capacity)
+        self._event = np.empty(capacity, dtype=np.int8)
+        self._direction = np.empty(capacity, dtype=np.int8)
+        self._asset = np.empty(capacity, dtype=object)
+        self._values = np.empty((capacity, len(self.FIELDS)))
+
+    def is_enabled(self, level):
+        """
+        Checks if messages of the given level are printed.
+        """
+        return self.level is not None and level >= self.level
+
+    def _grow(self):
+        capacity = 2 * len(self._datetime)
+        for name in ["_datetime", "_event", "_direction", "_asset",
+                     "_values"]:
+            buffer = getattr(self, name)
+            new_buffer = np.empty((capacity,) + buffer.shape[1:],
+                                  dtype=buffer.dtype)
+            new_buffer[:self.n_events] = buffer[:self.n_events]
+            setattr(self, name, new_buffer)
+
+    def record(self, dt, event, direction="", asset=None, **values):
+        """
+        Records a trade event and prints it if its level is enabled.
+
+        Args:
+            dt (float): The date of the event in backtrader's format, for
+                example, `self.datas[0].datetime[0]`
+            event (str): The event, can be a value in ["created", "executed",
+                "failed", "result"]
+            direction (str, optional): The direction of the order, can be a
+                value in ["b", "s"]. Defaults to "".
+            asset (str, optional): The name of the asset. Defaults to None.
+            **values: The numeric fields of the event, see `FIELDS`
+        """
+        if self.n_events == len(self._datetime):
+            self._grow()
+
+        ind = self.n_events
+        event_ind = self.EVENTS.index(event)
+        self._datetime[ind] = dt
+        self._event[ind] = event_ind
+        self._direction[ind] = self.DIRECTIONS.index(direction)
+        self._asset[ind] = asset
+        self._values[ind] = [values.get(field, np.nan)
+                             for field in self.FIELDS]
+        self.n_events += 1
+
+        if self.is_enabled(self.EVENT_LEVELS[event_ind]):
+            print(self.format_event(ind))
+
+    def format_event(self, ind):
+        """
+        Formats the log string of the recorded event with index `ind`.
+        """
+        event = self.EVENTS[self._event[ind]]
+        asset = self._asset[ind]
+        values = {field: (None if np.isnan(value) else value)
+                  for field, value in zip(self.FIELDS, self._values[ind])}
+
+        if event == "result":
+            txt = get_result_log_string(gross=values["gross"],
+                                        net=values["net"])
+        elif event == "failed":
+            txt = "Order Failed" if asset is None else f"Order Failed: {asset}"
+        else:
+            txt = get_action_log_string(
+                dir=self.DIRECTIONS[self._direction[ind]],
+                action="c" if event == "created" else "e",
+                asset=asset,
+                **{field: values[field] for field in self.FIELDS[:7]}
+            )
+
+        dt = bt.num2date(self._datetime[ind]).date().isoformat()
+        return f"{dt}: {txt}"
+
+    def to_frame(self):
+        """
+        Returns the recorded events as a data frame.
+        """
+        n = self.n_events
+        df = pd.DataFrame(self._values[:n], columns=self.FIELDS)
+        df.insert(0, "datetime",
+                  [bt.num2date(dt) for dt in self._datetime[:n]])
+        df.insert(1, "event", np.array(self.EVENTS)[self._event[:n]])
+        df.insert(2, "direction",
+                  np.array(self.DIRECTIONS)[self._direction[:n]])
+        df.insert(3, "asset", self._asset[:n])
+        return df
+
+    def to_parquet(self, path):
+        """
+        Saves the recorded events to a Parquet file.
+        """
+        self.to_frame().to_parquet(path)
@@ -0,0 +1,298 @@
+import numpy as np
+import pandas as pd
+
+
+def sma(close, period):
+    """
+    Simple Moving Average, equivalent to `bt.ind.SMA`.
+
+    Args:
+        close (pd.Series/pd.DataFrame): The close prices
+        period (int): The window of the moving average
+
+    Returns:
+        pd.Series/pd.DataFrame: The moving average (NaN during the warm-up)
+    """
+    return close.rolling(window=period).mean()
+
+
+def smoothed_moving_average(x, period):
+    """
+    Smoothed (Wilder's) Moving Average, equivalent to
+    `bt.ind.SmoothedMovingAverage`. It is seeded with the simple average of
+    the first `period` valid values and then follows an exponential
+    smoothing with alpha = 1 / period.
+
+    Args:
+        x (pd.Series): The input series, possibly starting with NaNs
+        period (int): The period of the average
+
+    Returns:
+        pd.Series: The smoothed moving average (NaN during the warm-up)
+    """
+    valid = x.dropna()
+    seeded = valid.rolling(window=period).mean()
+    seeded.iloc[period:] = valid.iloc[period:]
+    smma = seeded.iloc[period - 1:].ewm(alpha=1 / period, adjust=False).mean()
+    return smma.reindex(x.index)
+
+
+def rsi(close, period=14):
+    """
+    Relative Strength Index, equivalent to `bt.ind.RSI` with the default
+    Wilder's smoothing.
+
+    Args:
+        close (pd.Series): The close prices
+        period (int): The period of the RSI
+
+    Returns:
+        pd.Series: The RSI (NaN during the warm-up)
+    """
+    diff = close.diff()
+    ma_up = smoothed_moving_average(diff.clip(lower=0), period)
+    ma_down = smoothed_moving_average((-diff).clip(lower=0), period)
+    with np.errstate(divide="ignore"):
+        rs = ma_up / ma_down
+    return 100.0 - 100.0 / (1.0 + rs)
+
+
+def _non_zero_difference(data0, data1):
+    """
+    Difference of two series, carrying forward the last non-zero value,
+    equivalent to `bt.ind.NonZeroDifference`.
+    """
+    diff = data0 - data1
+    return diff.where(diff != 0).ffill().fillna(0.0)
+
+
+def cross_up(data0, data1):
+    """
+    Boolean series indicating when `data0` crosses `data1` upwards,
+    equivalent to `bt.ind.CrossUp`.
+    """
+    before = _non_zero_difference(data0, data1).shift(1) < 0
+    return before & (data0 > data1)
+
+
+def cross_down(data0, data1):
+    """
+    Boolean series indicating when `data0` crosses `data1` downwards,
+    equivalent to `bt.ind.CrossDown`.
+    """
+    before = _non_zero_difference(data0, data1).shift(1) > 0
+    return before & (data0 < data1)
+
+
+def signals_to_positions(long_entry, long_exit, short_entry=None,
+                         short_exit=None):
+    """
+    Converts the entry/exit signals into the target positions, following the
+    logic of backtrader: an entry is taken only without an open position,
+    while an exit only closes an existing position in the given direction.
+
+    Long/flat signals that never fire together are resolved with a forward
+    fill. Otherwise, a loop over the bars with any signal is used, updating
+    the positions of all the columns at once. Both work column-wise for
+    DataFrames of many tickers or parameter sets.
+
+    Args:
+        long_entry (pd.Series/pd.DataFrame): Boolean signals to go long
+        long_exit (pd.Series/pd.DataFrame): Boolean signals to close a long
+            position
+        short_entry (pd.Series/pd.DataFrame, optional): Boolean signals to go
+            short. Defaults to None.
+        short_exit (pd.Series/pd.DataFrame, optional): Boolean signals to
+            close a short position. Defaults to None.
+
+    Returns:
+        pd.Series/pd.DataFrame: The target positions (1 long, 0 flat,
+            -1 short) decided at the close of each bar
+    """
+    long_entry = long_entry.fillna(False).astype(bool)
+    long_exit = long_exit.fillna(False).astype(bool)
+
+    if short_entry is None and short_exit is None:
+        if not (long_entry & long_exit).to_numpy().any():
+            positions = long_entry.astype(float).where(long_entry | long_exit)
+            return positions.ffill().fillna(0.0)
+        short_entry = short_exit = long_entry & False
+
+    short_entry = short_entry.fillna(False).astype(bool)
+    short_exit = short_exit.fillna(False).astype(bool)
+
+    # (bars, columns) arrays, a Series being a single column
+    n_bars = len(long_entry)
+    l_enter, l_exit, s_enter, s_exit = [
+        signal.to_numpy().reshape(n_bars, -1)
+        for signal in (long_entry, long_exit, short_entry, short_exit)
+    ]
+    positions = np.empty(l_enter.shape)
+    position = np.zeros(l_enter.shape[1])
+    last_ind = 0
+
+    any_signal = (l_enter | l_exit | s_enter | s_exit).any(axis=1)
+    for ind in np.flatnonzero(any_signal):
+        positions[last_ind:ind] = position
+        flat = position == 0
+        position = np.where(
+            flat & l_enter[ind], 1.0,
+            np.where(flat & s_enter[ind], -1.0,
+                     np.where(((position > 0) & l_exit[ind])
+                              | ((position < 0) & s_exit[ind]),
+                              0.0, position))
+        )
+        last_ind = ind
+
+    positions[last_ind:] = position
+
+    if isinstance(long_entry, pd.DataFrame):
+        return pd.DataFrame(positions, index=long_entry.index,
+                            columns=long_entry.columns)
+    return pd.Series(positions[:, 0], index=long_entry.index)
+
+
+def vectorized_backtest(df, positions, cash=1000.0, commission=0.0,
+                        stake=1):
+    """
+    Runs a vectorized backtest of target positions decided at the close of
+    each bar. It reproduces the conventions of a backtrader run with market
+    orders and the default `FixedSize` sizer:
+    * the orders are filled at the open of the following bar (orders created
+      on the last bar are never filled),
+    * the commission follows `cerebro.broker.setcommission(commission=...)`
+      for stocks, that is, a percentage of the value of each fill,
+    * the portfolio value is the cash plus the position marked at the close.
+    The cash is not checked, so orders which backtrader would reject due to
+    insufficient margin are filled.
+
+    Many tickers or parameter sets are backtested at once by passing the
+    positions as a DataFrame, with one column per backtest. The prices are
+    then either a single series shared by all columns (for example, a grid
+    of parameters on one ticker) or, for `df` with (field, ticker) columns
+    as downloaded by yfinance for many tickers, one series per column.
+
+    Args:
+        df (pd.DataFrame): OHLC data with "open" and "close" columns (the
+            capitalized names used by yfinance are also accepted)
+        positions (pd.Series/pd.DataFrame): Target positions in units of
+            `stake`, for example, from `signals_to_positions`
+        cash (float, optional): The starting cash. Defaults to 1000.0.
+        commission (float, optional): The commission rate. Defaults to 0.0.
+        stake (int, optional): The number of shares per unit of position.
+            Defaults to 1.
+
+    Returns:
+        pd.DataFrame: Per-bar results with the held position, the executed
+            size, fill price and commission, the cash and the portfolio value.
+            For DataFrame positions, the columns are (field, column) pairs,
+            so that, for example, `results["value"]` contains the portfolio
+            values of all the backtests
+    """
+    columns = {col.lower(): col
+               for col in df.columns.get_level_values(0).unique()}
+    open_price = df[columns["open"]]
+    close_price = df[columns["close"]]
+
+    if isinstance(positions, pd.DataFrame):
+        if isinstance(open_price, pd.DataFrame):
+            open_price = open_price[positions.columns]
+            close_price = close_price[positions.columns]
+        n_cols = positions.shape[1]
+    else:
+        n_cols = 1
+
+    # (bars, columns) arrays, the prices being broadcast when shared
+    n_bars = len(df)
+    open_price = open_price.to_numpy(dtype=float).reshape(n_bars, -1)
+    close_price = close_price.to_numpy(dtype=float).reshape(n_bars, -1)
+
+    # the position decided at the close of t is held from the open of t+1
+    target = positions.to_numpy(dtype=float).reshape(n_bars, n_cols) * stake
+    held = np.vstack((np.zeros((1, n_cols)), target[:-1]))
+    size = np.diff(held, axis=0, prepend=0.0)
+
+    fill_price = np.where(size != 0, open_price, np.nan)
+    comm = np.abs(size) * open_price * commission
+    cash_flow = np.where(size != 0, -size * open_price - comm, 0.0)
+    cash_balance = cash + np.cumsum(cash_flow, axis=0)
+
+    results = {
+        "position": held,
+        "size": size,
+        "fill_price": fill_price,
+        "commission": np.where(size != 0, comm, 0.0),
+        "cash": cash_balance,
+        "value": cash_balance + held * close_price,
+    }
+
+    if isinstance(positions, pd.DataFrame):
+        return pd.concat(
+            {field: pd.DataFrame(values, index=df.index,
+                                 columns=positions.columns)
+             for field, values in results.items()},
+            axis=1,
+        )
+    return pd.DataFrame({field: values[:, 0]
+                         for field, values in results.items()},
+                        index=df.index)
+
+
+def backtest_sma_strategy(df, ma_period=20, cash=1000.0, commission=0.0,
+                          stake=1):
+    """
+    Vectorized equivalent of `SmaStrategy` (and of `SmaSignal` used with
+    `bt.SIGNAL_LONG`): go long when the close is above its SMA and close the
+    position when it falls below it.
+
+    Args:
+        df (pd.DataFrame): OHLC data
+        ma_period (int, optional): The period of the SMA. Defaults to 20.
+        cash (float, optional): The starting cash. Defaults to 1000.0.
+        commission (float, optional): The commission rate. Defaults to 0.0.
+        stake (int, optional): The number of shares per trade. Defaults to 1.
+
+    Returns:
+        pd.DataFrame: The results of `vectorized_backtest`
+    """
+    close = df[{col.lower(): col for col in df.columns}["close"]]
+    sma_line = sma(close, ma_period)
+    positions = signals_to_positions(long_entry=close > sma_line,
+                                     long_exit=close < sma_line)
+    return vectorized_backtest(df, positions, cash=cash,
+                               commission=commission, stake=stake)
+
+
+def backtest_rsi_strategy(df, rsi_periods=14, rsi_upper=70, rsi_lower=30,
+                          rsi_mid=50, cash=1000.0, commission=0.0, stake=1):
+    """
+    Vectorized equivalent of `RsiSignalStrategy`: go long when the RSI
+    crosses the lower band upwards (exit above the middle level) and go
+    short when it crosses the upper band downwards (exit below the middle
+    level).
+
+    Args:
+        df (pd.DataFrame): OHLC data
+        rsi_periods (int, optional): The period of the RSI. Defaults to 14.
+        rsi_upper (float, optional): The upper band. Defaults to 70.
+        rsi_lower (float, optional): The lower band. Defaults to 30.
+        rsi_mid (float, optional): The middle level. Defaults to 50.
+        cash (float, optional): The starting cash. Defaults to 1000.0.
+        commission (float, optional): The commission rate. Defaults to 0.0.
+        stake (int, optional): The number of shares per trade. Defaults to 1.
+
+    Returns:
+        pd.DataFrame: The results of `vectorized_backtest`
+    """
+    close = df[{col.lower(): col for col in df.columns}["close"]]
+    rsi_line = rsi(close, rsi_periods)
+    lower_band = pd.Series(rsi_lower, index=close.index, dtype=float)
+    upper_band = pd.Series(rsi_upper, index=close.index, dtype=float)
+    positions = signals_to_positions(
+        long_entry=cross_up(rsi_line, lower_band),
+        long_exit=rsi_line > rsi_mid,
+        short_entry=cross_down(rsi_line, upper_band),
+        short_exit=rsi_line < rsi_mid,
+    )
+    return vectorized_backtest(df, positions, cash=cash,
+                               commission=commission, stake=stake)